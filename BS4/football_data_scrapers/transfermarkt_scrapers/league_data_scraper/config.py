@@ -0,0 +1,57 @@
+BASE_URL = 'https://www.transfermarkt.co.uk'
+
+# Query parameters
+# The league is identified by its name in the URL and its ID
+# (e.g. GB1 for the Premier League, ES1 for LaLiga)
+LEAGUE_SLUG = 'premier-league'
+LEAGUE_ID = 'GB1'
+# The year in which the season started
+SEASON_ID = '2023'
+
+# The page listing all clubs of the league in the season
+LEAGUE_PAGE_URL = BASE_URL + f'/{LEAGUE_SLUG}/startseite/wettbewerb/{LEAGUE_ID}/plus/?saison_id={SEASON_ID}'
+
+# Maximum number of requests that can be in flight at once
+MAX_CONCURRENT_REQUESTS = 4
+
+# Retries
+# Responses with these status codes are retried, as are requests
+# that fail because of a connection error
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# Number of times a request is retried before it is given up on
+MAX_RETRIES = 3
+# Retries wait a random time of up to the base delay doubled on every
+# attempt and capped at the maximum delay
+RETRY_BASE_DELAY_SECONDS = 1
+RETRY_MAX_DELAY_SECONDS = 30
+
+# Database
+# Use 'mongomock://localhost' to run against an in-memory stand-in
+# for MongoDB (requires the mongomock package)
+MONGO_URI = 'mongodb://localhost:27017'
+DATABASE_NAME = 'transfermarkt'
+CLUBS_COLLECTION = 'clubs'
+PLAYERS_COLLECTION = 'players'
+# Number of documents sent to the database in one bulk write
+BULK_WRITE_BATCH_SIZE = 500
+
+HEADERS_LIST = [
+	{
+		"name": "Accept",
+		"value": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/png,image/svg+xml,*/*;q=0.8"
+	},
+	{
+		"name": "Accept-Encoding",
+		"value": "gzip, deflate"
+	},
+	{
+		"name": "Accept-Language",
+		"value": "en-US,en;q=0.5"
+	},
+	{
+		"name": "User-Agent",
+		"value": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:129.0) Gecko/20100101 Firefox/129.0"
+	}
+]
+# Converting headers copied from the browser to a single dictionary
+HEADERS = { header['name']: header['value'] for header in HEADERS_LIST }
@@ -0,0 +1,141 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+'''
+Structured logging shared by the Transfermarkt scrapers. Records are
+put on a queue by the code that logs them and written to the console
+by a background thread, so hot paths never wait on console I/O.
+Repeated messages are rate limited before they reach the queue.
+
+The level and format can be set with the SCRAPER_LOG_LEVEL (e.g.
+DEBUG, INFO, WARNING) and SCRAPER_LOG_FORMAT (text or json)
+environment variables.
+'''
+
+LOG_LEVEL = os.environ.get('SCRAPER_LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('SCRAPER_LOG_FORMAT', 'text')
+# A message is written at most this many times per interval
+REPEAT_LIMIT = 5
+REPEAT_INTERVAL_SECONDS = 60
+
+ROOT_LOGGER_NAME = 'scrapers'
+
+# Attributes every LogRecord has. Anything else on a record was
+# passed through `extra` and is written as a structured field.
+STANDARD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+class StructuredFormatter(logging.Formatter):
+    '''
+    Formats records as a line of text followed by key=value pairs
+    for the fields passed through `extra`, or as one JSON object
+    per line
+    '''
+    def __init__(self, json_output: bool=False) -> None:
+        super().__init__()
+        self.json_output = json_output
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {
+            key: value for key, value in vars(record).items()
+            if key not in STANDARD_ATTRIBUTES
+        }
+        if self.json_output:
+            entry = {
+                'time': self.formatTime(record),
+                'level': record.levelname,
+                'logger': record.name,
+                'message': record.getMessage(),
+                **fields,
+            }
+            return json.dumps(entry, default=str)
+        line = (
+            f'{self.formatTime(record)} {record.levelname} '
+            f'{record.name}: {record.getMessage()}'
+        )
+        if fields:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        return line
+
+
+class RepeatFilter(logging.Filter):
+    '''
+    Lets every message through at most REPEAT_LIMIT times per
+    interval. Messages are told apart by their format string so
+    messages that only differ in their arguments count as repeats.
+    The number of suppressed messages is added to the first one let
+    through in the next interval.
+    '''
+    def __init__(
+            self,
+            limit: int=REPEAT_LIMIT,
+            interval: float=REPEAT_INTERVAL_SECONDS
+    ) -> None:
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self.lock:
+            window_start, count, suppressed = self.counters.get(key, (now, 0, 0))
+            if now - window_start >= self.interval:
+                window_start, count = now, 0
+            if count >= self.limit:
+                self.counters[key] = (window_start, count, suppressed + 1)
+                return False
+            self.counters[key] = (window_start, count + 1, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class ProcessAwareQueueHandler(QueueHandler):
+    '''
+    Queue handler that starts a new queue and listener when it is
+    used in a process forked from the one that created it, e.g. in
+    the workers of a process pool, since the listener thread does
+    not survive the fork
+    '''
+    def __init__(self) -> None:
+        super().__init__(None)
+        self.start_listener()
+
+    def start_listener(self) -> None:
+        self.pid = os.getpid()
+        self.queue = queue.SimpleQueue()
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(StructuredFormatter(LOG_FORMAT == 'json'))
+        self.listener = QueueListener(self.queue, console_handler)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.pid != os.getpid():
+            self.start_listener()
+        super().enqueue(record)
+
+
+def get_logger(name: str) -> logging.Logger:
+    '''
+    Returns the logger for the given module. All loggers share the
+    queue handler set up on the first call.
+    '''
+    root_logger = logging.getLogger(ROOT_LOGGER_NAME)
+    if not root_logger.handlers:
+        handler = ProcessAwareQueueHandler()
+        handler.addFilter(RepeatFilter())
+        root_logger.addHandler(handler)
+        root_logger.setLevel(LOG_LEVEL)
+        # Records are only handled by the queue handler
+        root_logger.propagate = False
+    return root_logger.getChild(name)
@@ -0,0 +1,28 @@
+import time
+import asyncio
+from contextlib import aclosing
+from storage import LeagueStorage
+from scraper import LeagueScraper
+
+async def main():
+    start_time = time.time()
+
+    scraper = LeagueScraper()
+    storage = LeagueStorage()
+    try:
+        # Clubs are queued for the database as soon as they are scraped
+        async with aclosing(scraper.scrape()) as clubs:
+            async for club, players in clubs:
+                await storage.save(club, players)
+    finally:
+        # Writing the clubs scraped so far even if the run failed
+        try:
+            await storage.close()
+        finally:
+            await scraper.close()
+
+    print(f'--- Time taken to execute : {time.time() - start_time}s ---')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,46 @@
+from schema import CLUB_SCHEMA, SQUAD_SCHEMA, STATS_SCHEMA
+from row_extractor import get_row_extractor
+
+
+class LeagueParser:
+    def __init__(self) -> None:
+        self.club_extractor = get_row_extractor(CLUB_SCHEMA)
+        self.squad_extractor = get_row_extractor(SQUAD_SCHEMA)
+        self.stats_extractor = get_row_extractor(STATS_SCHEMA)
+
+    def extract(self, extractor, html: bytes) -> list[dict]:
+        '''
+        Returns the rows of the main table of the given page as dicts
+        keyed by the names of the fields of the extractor's schema
+        '''
+        if html is None:
+            return []
+        return [dict(zip(extractor.fields, row)) for row in extractor.extract(html)]
+
+    def parse_clubs(self, html: bytes) -> list[dict]:
+        '''
+        Returns the clubs listed on the league page. Rows without a
+        link to the club's page are left out.
+        '''
+        clubs = self.extract(self.club_extractor, html)
+        return [club for club in clubs if club['club_url'] is not None]
+
+    def parse_squad(self, html: bytes) -> list[dict]:
+        '''
+        Returns the players listed on the detailed squad page of a
+        club. Rows without a link to the player's page are left out.
+        '''
+        players = self.extract(self.squad_extractor, html)
+        return [player for player in players if player['player_id'] is not None]
+
+    def parse_stats(self, html: bytes) -> dict:
+        '''
+        Returns the performance stats of every player on the detailed
+        performance page of a club, keyed by player ID
+        '''
+        stats = {}
+        for player_stats in self.extract(self.stats_extractor, html):
+            player_id = player_stats.pop('player_id')
+            if player_id is not None:
+                stats[player_id] = player_stats
+        return stats
@@ -0,0 +1,170 @@
+import operator
+from functools import partial
+from collections import namedtuple
+from bs4 import BeautifulSoup
+from logger import get_logger
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:
+    lxml_html = None
+
+'''
+Extracts the rows of the main table of a Transfermarkt page as tuples
+of the fields declared in a schema. Shared by the Transfermarkt
+scrapers, which only declare the schemas of their tables. Pages are
+parsed with lxml, or with BeautifulSoup when lxml is not installed.
+'''
+
+logger = get_logger('parser')
+
+# cell: index of the row's cell that holds the value
+# xpath: elements inside the cell to read with the lxml backend
+# selector: equivalent CSS selector for the BeautifulSoup backend,
+#           None means the cell itself
+# attribute: attribute to read from the elements, None means their text
+# many: whether every matched element is read or only the first one
+# post_process: turns the value(s) read into the field's value
+Field = namedtuple(
+    'Field',
+    ['name', 'cell', 'xpath', 'selector', 'attribute', 'many', 'post_process']
+)
+
+def strip(value: str) -> str:
+    return value.strip()
+
+def prefix_with(prefix: str) -> callable:
+    '''
+    Returns a post_process function putting the given prefix before
+    the value, e.g. the site's URL before the path of a link
+    '''
+    return partial(operator.add, prefix)
+
+# Finds the rows of the main table of a page
+ROWS_XPATH = (
+    "(//table[contains(concat(' ', normalize-space(@class), ' '), ' items ')])[1]"
+    "//tr[contains(concat(' ', normalize-space(@class), ' '), ' odd ')"
+    " or contains(concat(' ', normalize-space(@class), ' '), ' even ')]"
+)
+
+class LxmlRowExtractor:
+    '''
+    Extracts rows with lxml. The XPath expressions of the schema are
+    compiled once so every row is handled by looking up its cells a
+    single time and evaluating one compiled expression per field.
+    '''
+    def __init__(self, schema: tuple, missing_value=None) -> None:
+        self.schema = schema
+        self.fields = tuple(field.name for field in schema)
+        self.missing_value = missing_value
+        self.find_rows = etree.XPath(ROWS_XPATH)
+        self.find_cells = etree.XPath('./td')
+        self.field_xpaths = [etree.XPath(field.xpath) for field in schema]
+        # Transfermarkt serves its pages in UTF-8
+        self.html_parser = lxml_html.HTMLParser(encoding='utf-8')
+
+    def load(self, html: bytes):
+        if isinstance(html, bytes):
+            return lxml_html.document_fromstring(html, parser=self.html_parser)
+        return lxml_html.document_fromstring(html)
+
+    def extract(self, html: bytes) -> list[tuple]:
+        return self.extract_rows(self.load(html))
+
+    def extract_rows(self, document) -> list[tuple]:
+        return [self.extract_row(row) for row in self.find_rows(document)]
+
+    def extract_row(self, row) -> tuple:
+        cells = self.find_cells(row)
+        values = []
+        for field, find_elements in zip(self.schema, self.field_xpaths):
+            try:
+                elements = find_elements(cells[field.cell])
+                if not field.many:
+                    elements = elements[:1]
+                    if not elements:
+                        raise LookupError(field.name)
+                if field.attribute is None:
+                    found = [element.text_content() for element in elements]
+                else:
+                    found = [element.attrib[field.attribute] for element in elements]
+                values.append(post_process(field, found))
+            except Exception:
+                values.append(missing_value(field, self.missing_value))
+        return tuple(values)
+
+
+class SoupRowExtractor:
+    '''
+    Extracts rows with BeautifulSoup using the CSS selectors of the
+    schema. Used when lxml is not installed.
+    '''
+    def __init__(self, schema: tuple, missing_value=None) -> None:
+        self.schema = schema
+        self.fields = tuple(field.name for field in schema)
+        self.missing_value = missing_value
+
+    def load(self, html: bytes) -> BeautifulSoup:
+        return BeautifulSoup(html, 'html.parser')
+
+    def extract(self, html: bytes) -> list[tuple]:
+        return self.extract_rows(self.load(html))
+
+    def extract_rows(self, soup: BeautifulSoup) -> list[tuple]:
+        table = soup.find('table', {'class': 'items'})
+        if table is None:
+            return []
+        rows = table.find_all('tr', {'class': ['odd', 'even']})
+        return [self.extract_row(row) for row in rows]
+
+    def extract_row(self, row: BeautifulSoup) -> tuple:
+        cells = row.find_all('td', recursive=False)
+        values = []
+        for field in self.schema:
+            try:
+                cell = cells[field.cell]
+                if field.selector is None:
+                    elements = [cell]
+                elif field.many:
+                    elements = cell.select(field.selector)
+                else:
+                    elements = cell.select(field.selector, limit=1)
+                    if not elements:
+                        raise LookupError(field.name)
+                if field.attribute is None:
+                    found = [element.get_text() for element in elements]
+                else:
+                    found = [element[field.attribute] for element in elements]
+                values.append(post_process(field, found))
+            except Exception:
+                values.append(missing_value(field, self.missing_value))
+        return tuple(values)
+
+
+def post_process(field, found: list[str]):
+    '''
+    Turns the values read for a field into the value stored in the row
+    '''
+    if field.many:
+        values = found
+    else:
+        values = found[0]
+    if field.post_process is not None:
+        values = field.post_process(values)
+    return values
+
+def missing_value(field, default_value=None):
+    '''
+    Logs an error message and returns the value used for fields
+    that could not be extracted
+    '''
+    logger.warning(f"Could not retrieve {field.name.replace('_', ' ')}")
+    return default_value
+
+def get_row_extractor(schema: tuple, missing_value=None):
+    '''
+    Returns an extractor for the given schema using lxml, falling
+    back to BeautifulSoup when lxml is not available
+    '''
+    if lxml_html is not None:
+        return LxmlRowExtractor(schema, missing_value)
+    return SoupRowExtractor(schema, missing_value)
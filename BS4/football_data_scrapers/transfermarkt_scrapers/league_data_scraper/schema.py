@@ -0,0 +1,79 @@
+import utils
+from config import BASE_URL
+from row_extractor import Field, strip, prefix_with
+
+'''
+Declares where every field of a club, player and player's stats is
+found in the rows of the tables of the league, squad and performance
+pages. This is the only place that needs to change when Transfermarkt
+changes the layout of one of the tables.
+'''
+
+add_base_url = prefix_with(BASE_URL)
+
+def get_club_id(path: str) -> str:
+    return utils.get_id_from_url(path, 'verein')
+
+def get_player_id(path: str) -> str:
+    return utils.get_id_from_url(path, 'spieler')
+
+# The link to the player's page in the cell holding the player's name
+PLAYER_LINK_XPATH = "(.//td[contains(concat(' ', normalize-space(@class), ' '), ' hauptlink ')]//a)[1]"
+PLAYER_LINK_SELECTOR = 'td.hauptlink a'
+
+def get_player_fields(cell: int) -> tuple:
+    '''
+    Returns the fields read from the cell holding the player's name,
+    which is at the given index of the row
+    '''
+    return (
+        Field('player_id', cell, PLAYER_LINK_XPATH, PLAYER_LINK_SELECTOR, 'href', False, get_player_id),
+        Field('player_name', cell, PLAYER_LINK_XPATH, PLAYER_LINK_SELECTOR, None, False, strip),
+        Field('player_page_url', cell, PLAYER_LINK_XPATH, PLAYER_LINK_SELECTOR, 'href', False, add_base_url),
+        Field('position', cell, '(.//tr)[2]', ':scope tr:nth-of-type(2)', None, False, strip),
+    )
+
+# Fields of the clubs table of the league page
+CLUB_SCHEMA = (
+    Field('club_id', 1, '(.//a)[1]', 'a', 'href', False, get_club_id),
+    Field('club_name', 1, '(.//a)[1]', 'a', 'title', False, None),
+    Field('club_url', 1, '(.//a)[1]', 'a', 'href', False, add_base_url),
+    Field('squad_size', 2, '.', None, None, False, utils.parse_int),
+    Field('average_age', 3, '.', None, None, False, utils.parse_number),
+    Field('foreigners', 4, '.', None, None, False, utils.parse_int),
+    Field('average_market_value_in_euros', 5, '.', None, None, False, utils.parse_market_value),
+    Field('total_market_value_in_euros', 6, '.', None, None, False, utils.parse_market_value),
+)
+
+# Fields of the detailed squad page of a club
+SQUAD_SCHEMA = get_player_fields(1) + (
+    Field('shirt_number', 0, '.', None, None, False, strip),
+    Field('date_of_birth', 2, '.', None, None, False, strip),
+    Field('nationalities', 3, './/img', 'img', 'title', True, list),
+    Field('height_in_metres', 4, '.', None, None, False, utils.parse_number),
+    Field('foot', 5, '.', None, None, False, strip),
+    Field('joined', 6, '.', None, None, False, strip),
+    Field('signed_from', 7, '(.//a)[1]', 'a', 'title', False, None),
+    Field('contract_expires', 8, '.', None, None, False, strip),
+    Field('market_value_in_euros', 9, '.', None, None, False, utils.parse_market_value),
+)
+
+# Fields of the detailed performance page of a club, only the player's
+# ID is read from the cell holding the player's name
+STATS_SCHEMA = get_player_fields(1)[:1] + tuple(
+    Field(name, cell, '.', None, None, False, utils.parse_int)
+    for name, cell in (
+        ('in_squad', 4),
+        ('appearances', 5),
+        ('goals', 6),
+        ('assists', 7),
+        ('yellow_cards', 8),
+        ('second_yellow_cards', 9),
+        ('red_cards', 10),
+        ('substituted_on', 11),
+        ('substituted_off', 12),
+    )
+) + (
+    Field('points_per_game', 13, '.', None, None, False, utils.parse_number),
+    Field('minutes_played', 14, '.', None, None, False, utils.parse_int),
+)
@@ -0,0 +1,104 @@
+import httpx
+import utils
+import asyncio
+from typing import AsyncIterator
+from parser import LeagueParser
+from logger import get_logger
+from config import (
+    HEADERS,
+    LEAGUE_ID,
+    SEASON_ID,
+    LEAGUE_PAGE_URL,
+    MAX_CONCURRENT_REQUESTS,
+    RETRY_STATUS_CODES,
+    MAX_RETRIES,
+    RETRY_BASE_DELAY_SECONDS,
+    RETRY_MAX_DELAY_SECONDS,
+)
+
+logger = get_logger('scraper')
+
+class LeagueScraper:
+    '''
+    Meant to handle communication with the server
+    '''
+    def __init__(self) -> None:
+        '''
+        Creates a session to be used throughout the program and
+        includes the headers from the config file
+        '''
+        self.client = httpx.AsyncClient(
+            headers=HEADERS, timeout=None, follow_redirects=True
+        )
+        self.semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        self.parser = LeagueParser()
+
+    async def scrape(self) -> AsyncIterator[tuple[dict, list[dict]]]:
+        '''
+        Yields every club of the league along with its players as soon
+        as the club's pages have been scraped
+        '''
+        league_html = await self.fetch_url(LEAGUE_PAGE_URL)
+        clubs = self.parser.parse_clubs(league_html)
+        logger.info(f'Found {len(clubs)} clubs')
+        tasks = [asyncio.create_task(self.scrape_club(club)) for club in clubs]
+        try:
+            for next_club in asyncio.as_completed(tasks):
+                yield await next_club
+        finally:
+            # Clubs still being scraped when the run stops are given up
+            # on before the client is closed
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def scrape_club(self, club: dict) -> tuple[dict, list[dict]]:
+        '''
+        Returns the given club along with its players. Every player
+        carries the stats from the club's performance page.
+        '''
+        squad_html, stats_html = await asyncio.gather(
+            self.fetch_url(utils.get_squad_url(club['club_url'], SEASON_ID)),
+            self.fetch_url(utils.get_stats_url(club['club_url'], LEAGUE_ID, SEASON_ID)),
+        )
+        players = self.parser.parse_squad(squad_html)
+        stats = self.parser.parse_stats(stats_html)
+        for player in players:
+            player['stats'] = stats.get(player['player_id'], {})
+        return club, players
+
+    async def fetch_url(self, url: str) -> bytes:
+        '''
+        Sends a GET request to the specified URL and returns the
+        body of the response in case the request is successful
+        and returns None otherwise. Connection errors and responses
+        with a status of RETRY_STATUS_CODES are retried.
+        '''
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                async with self.semaphore:
+                    response = await self.client.get(url)
+            except httpx.HTTPError as error:
+                error_message = str(error) or type(error).__name__
+                status_code = None
+            else:
+                if response.status_code == 200:
+                    logger.debug('Fetched', extra={'url': url})
+                    return response.content
+                error_message = f'Status Code: {response.status_code}'
+                status_code = response.status_code
+            if attempt == MAX_RETRIES or (
+                status_code is not None and status_code not in RETRY_STATUS_CODES
+            ):
+                logger.warning('Could not fetch', extra={'url': url, 'error': error_message})
+                return None
+            delay = utils.get_retry_delay(
+                attempt, RETRY_BASE_DELAY_SECONDS, RETRY_MAX_DELAY_SECONDS
+            )
+            logger.info('Retrying', extra={
+                'url': url, 'error': error_message, 'delay': round(delay, 2)
+            })
+            await asyncio.sleep(delay)
+
+    async def close(self) -> None:
+        await self.client.aclose()
@@ -0,0 +1,111 @@
+import asyncio
+from pymongo import MongoClient, UpdateOne, ASCENDING
+from logger import get_logger
+from config import (
+    MONGO_URI,
+    DATABASE_NAME,
+    CLUBS_COLLECTION,
+    PLAYERS_COLLECTION,
+    BULK_WRITE_BATCH_SIZE,
+    LEAGUE_ID,
+    SEASON_ID,
+)
+
+logger = get_logger('storage')
+
+def get_client(uri: str=MONGO_URI):
+    '''
+    Returns a client for the database at the given URI. URIs
+    starting with mongomock:// return an in-memory stand-in which
+    is useful for trying the scraper without a running mongod.
+    '''
+    if uri.startswith('mongomock://'):
+        import mongomock
+        return mongomock.MongoClient()
+    return MongoClient(uri)
+
+
+class LeagueStorage:
+    '''
+    Stores clubs and players in MongoDB. Documents are upserted in
+    bulk writes of up to BULK_WRITE_BATCH_SIZE operations so a whole
+    league only takes a few round trips to the database.
+    '''
+    def __init__(self, client=None) -> None:
+        self.client = client if client is not None else get_client()
+        database = self.client[DATABASE_NAME]
+        self.collections = {
+            CLUBS_COLLECTION: database[CLUBS_COLLECTION],
+            PLAYERS_COLLECTION: database[PLAYERS_COLLECTION],
+        }
+        self.pending_operations = {name: [] for name in self.collections}
+        self.documents_written = {name: 0 for name in self.collections}
+        self.create_indexes()
+
+    def create_indexes(self) -> None:
+        '''
+        Creates the unique indexes used to find the documents to
+        upsert. Creating an index that already exists does nothing.
+        '''
+        self.collections[CLUBS_COLLECTION].create_index(
+            [('league', ASCENDING), ('season', ASCENDING), ('club_id', ASCENDING)],
+            unique=True
+        )
+        self.collections[PLAYERS_COLLECTION].create_index(
+            [
+                ('league', ASCENDING),
+                ('season', ASCENDING),
+                ('club_id', ASCENDING),
+                ('player_id', ASCENDING),
+            ],
+            unique=True
+        )
+
+    async def save(self, club: dict, players: list[dict]) -> None:
+        '''
+        Queues the given club and its players to be upserted
+        '''
+        key = {'league': LEAGUE_ID, 'season': SEASON_ID, 'club_id': club['club_id']}
+        await self.queue(CLUBS_COLLECTION, key, club)
+        for player in players:
+            await self.queue(PLAYERS_COLLECTION, {**key, 'player_id': player['player_id']}, player)
+
+    async def queue(self, collection_name: str, key: dict, document: dict) -> None:
+        '''
+        Queues an upsert of the given document and writes the queued
+        operations of the collection once a batch is full
+        '''
+        operations = self.pending_operations[collection_name]
+        operations.append(
+            UpdateOne(key, {'$set': {**key, **document}}, upsert=True)
+        )
+        if len(operations) >= BULK_WRITE_BATCH_SIZE:
+            await self.flush(collection_name)
+
+    async def flush(self, collection_name: str) -> None:
+        '''
+        Sends all queued operations of a collection in one bulk write.
+        pymongo blocks while the write is sent, so it runs in a thread
+        to let the scraper keep fetching pages meanwhile.
+        '''
+        operations = self.pending_operations[collection_name]
+        if not operations:
+            return
+        self.pending_operations[collection_name] = []
+        # Unordered writes let the server apply the batch in parallel
+        await asyncio.to_thread(
+            self.collections[collection_name].bulk_write, operations, ordered=False
+        )
+        self.documents_written[collection_name] += len(operations)
+
+    async def close(self) -> None:
+        '''
+        Writes any remaining operations and closes the connection
+        '''
+        for collection_name in self.collections:
+            await self.flush(collection_name)
+            logger.info(
+                f'{self.documents_written[collection_name]} documents have '
+                f'been written to {collection_name}'
+            )
+        await asyncio.to_thread(self.client.close)
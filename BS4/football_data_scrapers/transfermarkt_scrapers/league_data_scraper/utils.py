@@ -0,0 +1,71 @@
+import re
+import random
+
+def get_id_from_url(url: str, kind: str) -> str:
+    '''
+    Returns the ID that follows the given kind of page in a
+    Transfermarkt URL, e.g. the club ID in /arsenal-fc/startseite/verein/11
+    '''
+    match = re.search(rf'/{kind}/(\d+)', url)
+    if match:
+        return match[1]
+    return None
+
+def get_squad_url(club_url: str, season_id: str) -> str:
+    '''
+    Returns the URL of the detailed squad page of the club whose
+    overview page is given
+    '''
+    club_url = club_url.split('/saison_id/')[0]
+    return club_url.replace('/startseite/', '/kader/') + f'/saison_id/{season_id}/plus/1'
+
+def get_stats_url(club_url: str, league_id: str, season_id: str) -> str:
+    '''
+    Returns the URL of the page with the performance stats of every
+    player of the club whose overview page is given
+    '''
+    club_url = club_url.split('/saison_id/')[0]
+    return (
+        club_url.replace('/startseite/', '/leistungsdaten/')
+        + f'/plus/1?reldata={league_id}%26{season_id}'
+    )
+
+def parse_market_value(text: str) -> int:
+    '''
+    Converts a market value such as €1.20bn, €85.00m or €500k to
+    euros. Returns None if the text does not hold an amount.
+    '''
+    match = re.search(r'€\s*([\d.,]+)\s*(bn|m|k|Th\.)?', text or '')
+    if not match:
+        return None
+    units = {'bn': 1_000_000_000, 'm': 1_000_000, 'k': 1_000, 'Th.': 1_000}
+    amount = float(match[1].replace(',', ''))
+    return round(amount * units.get(match[2], 1))
+
+def parse_number(text: str) -> float:
+    '''
+    Converts a decimal number shown on the page (e.g. 24.6 or 1,85m)
+    to a float. Returns None if the text does not hold a number.
+    '''
+    match = re.search(r'\d+(?:[.,]\d+)?', text or '')
+    if not match:
+        return None
+    return float(match[0].replace(',', '.'))
+
+def parse_int(text: str) -> int:
+    '''
+    Converts a count shown on the page to an int. Dashes and empty
+    cells, which Transfermarkt shows for zero, become 0.
+    '''
+    digits = re.sub(r'\D', '', text or '')
+    if not digits:
+        return 0
+    return int(digits)
+
+def get_retry_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    '''
+    Returns the number of seconds to wait before the given retry
+    (starting at 0). The delay is drawn at random up to the capped
+    exponential backoff so retries of many requests spread out.
+    '''
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
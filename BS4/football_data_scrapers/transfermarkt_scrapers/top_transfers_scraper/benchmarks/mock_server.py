@@ -0,0 +1,364 @@
+import os
+import re
+import csv
+import ast
+import json
+import time
+import random
+import threading
+from html import escape
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+'''
+A local stand-in for Transfermarkt used by the benchmarks. Listing
+pages are rebuilt in Transfermarkt's markup (including the pagination
+list) from a fixture of recorded transfers in their raw scraped form,
+and portraits are served from the images stored in All_Seasons. The
+fixture is kept apart from the scraper's own output, which a run of
+main.py rewrites in normalized form. Player profiles and their
+market value charts are made up from the player's ID. Latency, jitter, errors
+and bandwidth can be set for every server.
+'''
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRAPER_DIR = os.path.dirname(BENCHMARKS_DIR)
+RECORDED_CSV_PATH = os.path.join(BENCHMARKS_DIR, 'fixtures', 'transfers.csv')
+RECORDED_IMAGES_PATH = os.path.join(SCRAPER_DIR, 'All_Seasons', 'player_images')
+LIVE_BASE_URL = 'https://www.transfermarkt.co.uk'
+LIVE_IMAGE_URL = 'https://img.a.transfermarkt.technology'
+# Number of transfers listed on one page, as on the live site
+ROWS_PER_PAGE = 25
+
+LISTING_PATH_REGEX = re.compile(r'/saison_id/(?P<season_id>[^/]+)/.*/page/(?P<page>\d+)$')
+IMAGE_EXTENSION_REGEX = re.compile(r'(\.[a-zA-Z]{3,4})(?=\?lm=1)')
+PROFILE_PATH_REGEX = re.compile(r'/profil/spieler/(?P<player_id>\d+)$')
+MARKET_VALUE_PATH_REGEX = re.compile(r'/ceapi/marketValueDevelopment/graph/(?P<player_id>\d+)$')
+
+@dataclass
+class ServerProfile:
+    '''
+    How a mock server behaves. Delays are in seconds, the error rate
+    is the share of responses replaced by one of the error statuses
+    and a bandwidth of None means responses are not throttled.
+    '''
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    error_statuses: tuple = (429, 500, 503)
+    bandwidth_bytes_per_second: int = None
+    seed: int = 0
+
+
+def load_recorded_transfers(csv_path: str=RECORDED_CSV_PATH) -> list[dict]:
+    with open(csv_path, encoding='utf-8') as file:
+        return list(csv.DictReader(file))
+
+def get_season_transfers(transfers: list[dict], season_id: str) -> list[dict]:
+    '''
+    Returns the transfers listed for the given season ID. Seasons are
+    stored as e.g. 17/18 while the season ID is the start year.
+    '''
+    if season_id == 'alle':
+        return transfers
+    return [
+        transfer for transfer in transfers
+        if transfer['season'].startswith(season_id[2:] + '/')
+    ]
+
+def render_club_cell(club_name: str, league_name: str) -> str:
+    return (
+        '<td><table class="inline-table"><tr>'
+        f'<td rowspan="2"><a title="{escape(club_name)}" href="/club/startseite/verein/1"><img src="/wappen.png"></a></td>'
+        f'<td class="hauptlink"><a title="{escape(club_name)}" href="/club/startseite/verein/1">{escape(club_name)}</a></td>'
+        f'</tr><tr><td><img src="/flagge.png"><a title="{escape(league_name)}" href="/league">{escape(league_name)}</a></td>'
+        '</tr></table></td>'
+    )
+
+def render_transfer_row(index: int, transfer: dict, image_url: str) -> str:
+    nationalities = ''.join(
+        f'<img title="{escape(country)}" class="flaggenrahmen"><br>'
+        for country in ast.literal_eval(transfer['player_nationalities'])
+    )
+    player_path = transfer['player_page_url'].replace(LIVE_BASE_URL, '')
+    player_image_url = transfer['player_image_url'].replace(LIVE_IMAGE_URL, image_url)
+    return (
+        f'<tr class="{"odd" if index % 2 == 0 else "even"}">'
+        f'<td class="zentriert">{index + 1}</td>'
+        '<td><table class="inline-table"><tr>'
+        f'<td rowspan="2"><img data-src="{escape(player_image_url)}" class="bilderrahmen-fixed lazy"></td>'
+        f'<td class="hauptlink"><a title="{escape(transfer["player_name"])}" href="{escape(player_path)}">{escape(transfer["player_name"])}</a></td>'
+        f'</tr><tr><td>{escape(transfer["player_position"])}</td></tr></table></td>'
+        f'<td class="zentriert">{escape(transfer["player_age"])}</td>'
+        f'<td class="rechts">{escape(transfer["player_value_in_euros"])}</td>'
+        f'<td class="zentriert"><a title="{escape(transfer["season"])}" href="/season">{escape(transfer["season"])}</a></td>'
+        f'<td class="zentriert">{nationalities}</td>'
+        + render_club_cell(transfer['old_club_name'], transfer['old_league_name'])
+        + render_club_cell(transfer['new_club_name'], transfer['new_league_name'])
+        + f'<td class="rechts hauptlink"><a href="/transfer">{escape(transfer["transfer_fee_in_euros"])}</a></td>'
+        '</tr>'
+    )
+
+def render_listing_page(
+        transfers: list[dict],
+        page: int,
+        image_url: str
+) -> bytes:
+    '''
+    Returns the HTML of the given page of the transfers table with
+    the same pagination list as the live site
+    '''
+    page_count = max(1, -(-len(transfers) // ROWS_PER_PAGE))
+    first_index = (page - 1) * ROWS_PER_PAGE
+    rows = ''.join(
+        render_transfer_row(index, transfer, image_url)
+        for index, transfer in enumerate(
+            transfers[first_index:first_index + ROWS_PER_PAGE], first_index
+        )
+    )
+    pagination = ''.join(
+        f'<li class="tm-pagination__list-item{" tm-pagination__list-item--active" if number == page else ""}">'
+        f'<a class="tm-pagination__link" href="/page/{number}">{number}</a></li>'
+        for number in range(1, page_count + 1)
+    )
+    pagination += (
+        '<li class="tm-pagination__list-item tm-pagination__list-item--icon-next-page">'
+        '<a class="tm-pagination__link" title="Go to next page" href="/page/next"></a></li>'
+    )
+    html = (
+        '<html><body><div class="responsive-table"><table class="items">'
+        f'<thead><tr><th>#</th></tr></thead><tbody>{rows}</tbody></table></div>'
+        f'<div class="pager"><ul class="tm-pagination">{pagination}</ul></div>'
+        '</body></html>'
+    )
+    return html.encode('utf-8')
+
+def get_player_transfers(transfers: list[dict]) -> dict:
+    '''
+    Returns the latest transfer of every player keyed by their ID
+    '''
+    player_transfers = {}
+    for transfer in transfers:
+        match = PROFILE_PATH_REGEX.search(transfer['player_page_url'])
+        if match is not None:
+            player_transfers.setdefault(match['player_id'], transfer)
+    return player_transfers
+
+def render_profile_page(player_id: str, transfer: dict) -> bytes:
+    '''
+    Returns the HTML of a player's profile with the same info table
+    as the live site. Details the recorded transfers do not hold are
+    made up from the player's ID.
+    '''
+    number = int(player_id)
+    details = [
+        ('Date of birth/Age:', f'<a href="/birthdays">{1 + number % 28:02}/{1 + number % 12:02}/{1970 + number % 35}</a> (25)'),
+        ('Height:', f'1,{70 + number % 25}&nbsp;m'),
+        ('Foot:', ('right', 'left', 'both')[number % 3]),
+        ('Current club:', f'<a title="{escape(transfer["new_club_name"])}" href="/club">{escape(transfer["new_club_name"])}</a>'),
+    ]
+    info_table = ''.join(
+        f'<span class="info-table__content info-table__content--regular">{label}</span>'
+        f'<span class="info-table__content info-table__content--bold">{value}</span>'
+        for label, value in details
+    )
+    html = (
+        f'<html><body><h1>{escape(transfer["player_name"])}</h1>'
+        f'<div class="info-table info-table--right-space">{info_table}</div>'
+        '</body></html>'
+    )
+    return html.encode('utf-8')
+
+def render_market_value_graph(player_id: str, transfer: dict) -> bytes:
+    '''
+    Returns the JSON behind the market value chart of a player's
+    profile with a made up point for every year of the last decade
+    '''
+    number = int(player_id)
+    points = [
+        {
+            'x': (1420070400 + year * 365 * 24 * 60 * 60) * 1000,
+            'y': (number % 50 + year) * 1_000_000,
+            'mw': f'€{number % 50 + year}.00m',
+            'verein': transfer['new_club_name'],
+        }
+        for year in range(10)
+    ]
+    return json.dumps({'list': points}).encode('utf-8')
+
+def load_recorded_images(
+        transfers: list[dict],
+        images_path: str=RECORDED_IMAGES_PATH
+) -> dict:
+    '''
+    Returns the stored portrait of every player keyed by the path of
+    its image URL. Players whose image is missing get a placeholder
+    of a similar size.
+    '''
+    images = {}
+    for transfer in transfers:
+        image_url = transfer['player_image_url']
+        match = IMAGE_EXTENSION_REGEX.search(image_url)
+        extension = match[1].lower() if match else '.jpg'
+        image_path = os.path.join(images_path, transfer['player_name'] + extension)
+        try:
+            with open(image_path, 'rb') as file:
+                images[urlsplit(image_url).path] = file.read()
+        except OSError:
+            images[urlsplit(image_url).path] = bytes(4 * 1024)
+    return images
+
+
+class MockServer:
+    '''
+    Serves the given routes in a background thread. A route takes
+    the request path and returns the body, or None for a 404.
+    '''
+    def __init__(self, route: callable, profile: ServerProfile=ServerProfile()) -> None:
+        self.route = route
+        self.profile = profile
+        self.random = random.Random(profile.seed)
+        self.random_lock = threading.Lock()
+        self.requests_served = 0
+        self.http_server = ThreadingHTTPServer(('127.0.0.1', 0), self.build_handler())
+        self.http_server.daemon_threads = True
+        self.thread = threading.Thread(target=self.http_server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.http_server.server_address
+        return f'http://{host}:{port}'
+
+    @property
+    def host(self) -> str:
+        return urlsplit(self.url).netloc
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.http_server.shutdown()
+        self.http_server.server_close()
+
+    def draw(self) -> tuple[float, int]:
+        '''
+        Returns the delay and the error status (None for no error) of
+        the next response
+        '''
+        with self.random_lock:
+            self.requests_served += 1
+            delay = self.profile.latency + self.random.uniform(0, self.profile.jitter)
+            status = None
+            if self.random.random() < self.profile.error_rate:
+                status = self.random.choice(self.profile.error_statuses)
+            return delay, status
+
+    def build_handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keeps connections open between requests like the live site
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self) -> None:
+                delay, error_status = server.draw()
+                time.sleep(delay)
+                if error_status is not None:
+                    self.send_response(error_status)
+                    if error_status == 429:
+                        self.send_header('Retry-After', '1')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = server.route(urlsplit(self.path).path)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.write_throttled(body)
+
+            def write_throttled(self, body: bytes) -> None:
+                bandwidth = server.profile.bandwidth_bytes_per_second
+                if bandwidth is None:
+                    self.wfile.write(body)
+                    return
+                chunk_size = 16 * 1024
+                for start in range(0, len(body), chunk_size):
+                    chunk = body[start:start + chunk_size]
+                    self.wfile.write(chunk)
+                    time.sleep(len(chunk) / bandwidth)
+
+            def log_message(self, format: str, *args) -> None:
+                # Request lines would drown out the benchmark's output
+                pass
+
+        return Handler
+
+
+class MockTransfermarkt:
+    '''
+    A listing server and an image server on separate ports, so the
+    scraper tells their requests apart the same way as on the live
+    site where they are on separate hosts
+    '''
+    def __init__(
+            self,
+            listing_profile: ServerProfile=ServerProfile(),
+            image_profile: ServerProfile=ServerProfile()
+    ) -> None:
+        self.transfers = load_recorded_transfers()
+        self.images = load_recorded_images(self.transfers)
+        self.player_transfers = get_player_transfers(self.transfers)
+        self.listing_server = MockServer(self.route_listing, listing_profile)
+        self.image_server = MockServer(self.route_image, image_profile)
+        self.pages = {}
+        self.pages_lock = threading.Lock()
+
+    def route_listing(self, path: str) -> bytes:
+        for regex, render in (
+            (PROFILE_PATH_REGEX, render_profile_page),
+            (MARKET_VALUE_PATH_REGEX, render_market_value_graph),
+        ):
+            match = regex.search(path)
+            if match is not None:
+                transfer = self.player_transfers.get(match['player_id'])
+                return None if transfer is None else render(match['player_id'], transfer)
+        match = LISTING_PATH_REGEX.search(path)
+        if match is None:
+            return None
+        key = (match['season_id'], int(match['page']))
+        # Pages are rendered once so rendering is not measured
+        with self.pages_lock:
+            if key not in self.pages:
+                self.pages[key] = render_listing_page(
+                    get_season_transfers(self.transfers, key[0]),
+                    key[1],
+                    self.image_server.url
+                )
+            return self.pages[key]
+
+    def route_image(self, path: str) -> bytes:
+        return self.images.get(path)
+
+    def start(self) -> None:
+        self.listing_server.start()
+        self.image_server.start()
+
+    def stop(self) -> None:
+        self.listing_server.stop()
+        self.image_server.stop()
+
+    def get_environment(self) -> dict:
+        '''
+        Returns the environment variables pointing the scraper's
+        config at the mock servers
+        '''
+        return {
+            'TRANSFERMARKT_BASE_URL': self.listing_server.url,
+            'TRANSFERMARKT_IMAGE_HOST': self.image_server.host,
+        }
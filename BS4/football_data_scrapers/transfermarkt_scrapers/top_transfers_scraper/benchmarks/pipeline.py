@@ -0,0 +1,89 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak RSS is not reported there
+    resource = None
+
+'''
+Runs the scraper's pipeline once, the same way as main.py, and writes
+its throughput and peak memory use to a JSON file. Started in its own
+process by run_benchmarks.py, with the environment pointing the
+scraper at the mock servers, so every run starts with an empty cache
+and its own peak RSS.
+'''
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRAPER_DIR)
+
+import main
+import scraper
+import storage
+from metrics import metrics
+
+def get_peak_rss_mb() -> tuple[float, float]:
+    '''
+    Returns the peak RSS of this process and the largest peak RSS of
+    its finished child processes (the parser workers) in megabytes
+    '''
+    if resource is None:
+        return None, None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    unit = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit,
+    )
+
+def run(arguments: argparse.Namespace) -> dict:
+    if arguments.requests_per_second is not None:
+        # Read by RequestScheduler when the scraper is created
+        scraper.REQUESTS_PER_SECOND = arguments.requests_per_second
+        scraper.REQUESTS_BURST_SIZE = max(1, int(arguments.requests_per_second))
+    if arguments.enrich_profiles:
+        scraper.ENRICH_PROFILES = True
+        storage.ENRICH_PROFILES = True
+    sys.argv = [main.__file__, '--seasons', arguments.seasons]
+    started = time.perf_counter()
+    asyncio.run(main.main())
+    elapsed = time.perf_counter() - started
+    pages = metrics.status_codes['listing'][200]
+    images = metrics.status_codes['image'][200]
+    # Every profile takes a profile page and a market value request
+    profiles = metrics.status_codes['profile'][200] // 2
+    peak_rss_mb, peak_worker_rss_mb = get_peak_rss_mb()
+    return {
+        'seconds': elapsed,
+        'pages': pages,
+        'images': images,
+        'profiles': profiles,
+        'records': metrics.records_written,
+        'errors': sum(
+            count
+            for status_codes in metrics.status_codes.values()
+            for status_code, count in status_codes.items()
+            if status_code >= 400
+        ),
+        'pages_per_second': pages / elapsed,
+        'images_per_second': images / elapsed,
+        'profiles_per_second': profiles / elapsed,
+        'peak_rss_mb': peak_rss_mb,
+        'peak_worker_rss_mb': peak_worker_rss_mb,
+    }
+
+
+if __name__ == '__main__':
+    argument_parser = argparse.ArgumentParser()
+    argument_parser.add_argument('--result', required=True)
+    argument_parser.add_argument('--seasons', default='alle')
+    argument_parser.add_argument('--requests-per-second', type=float)
+    argument_parser.add_argument('--enrich-profiles', action='store_true')
+    arguments = argument_parser.parse_args()
+    result = run(arguments)
+    with open(arguments.result, 'w', encoding='utf-8') as file:
+        json.dump(result, file)
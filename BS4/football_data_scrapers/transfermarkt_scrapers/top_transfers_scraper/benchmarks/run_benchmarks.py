@@ -0,0 +1,176 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+from mock_server import MockTransfermarkt, ServerProfile
+
+'''
+Measures the throughput of the scraper against local mock servers and
+compares it with the stored baselines. Every scenario runs the
+pipeline in a fresh process and directory. A scenario regresses when
+its pages/sec or images/sec fall, or its peak RSS grows, by more than
+the tolerance.
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --scenario slow_network
+    python benchmarks/run_benchmarks.py --update-baselines
+'''
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINES_PATH = os.path.join(BENCHMARKS_DIR, 'baselines.json')
+PIPELINE_PATH = os.path.join(BENCHMARKS_DIR, 'pipeline.py')
+# Share by which a result can be worse than its baseline
+TOLERANCE = 0.2
+
+# requests_per_second: None keeps the rate limit of config.py, a
+# number lifts it so the scraper itself is measured. enrich_profiles
+# turns on the profile enrichment stage.
+SCENARIOS = {
+    'local': {
+        'listing': ServerProfile(),
+        'image': ServerProfile(),
+        'requests_per_second': 1000,
+    },
+    'slow_network': {
+        'listing': ServerProfile(latency=0.15, jitter=0.1),
+        'image': ServerProfile(latency=0.05, jitter=0.05, bandwidth_bytes_per_second=256 * 1024),
+        'requests_per_second': 1000,
+    },
+    'flaky_images': {
+        'listing': ServerProfile(latency=0.05),
+        'image': ServerProfile(latency=0.05, error_rate=0.1, seed=1),
+        'requests_per_second': 1000,
+    },
+    'flaky_servers': {
+        'listing': ServerProfile(latency=0.05, error_rate=0.2, seed=2),
+        'image': ServerProfile(latency=0.05, error_rate=0.1, seed=3),
+        'requests_per_second': 1000,
+    },
+    'configured_rate_limit': {
+        'listing': ServerProfile(latency=0.05),
+        'image': ServerProfile(latency=0.02),
+        'requests_per_second': None,
+    },
+    'profiles': {
+        'listing': ServerProfile(latency=0.05, jitter=0.05),
+        'image': ServerProfile(latency=0.02),
+        'requests_per_second': 1000,
+        'enrich_profiles': True,
+    },
+}
+
+# Metrics compared with the baselines and whether higher is better
+COMPARED_METRICS = {
+    'pages_per_second': True,
+    'images_per_second': True,
+    'profiles_per_second': True,
+    'peak_rss_mb': False,
+}
+
+def run_scenario(name: str, scenario: dict) -> dict:
+    '''
+    Starts the mock servers of the scenario and runs the pipeline
+    against them in a new process
+    '''
+    site = MockTransfermarkt(scenario['listing'], scenario['image'])
+    site.start()
+    try:
+        with tempfile.TemporaryDirectory(prefix=f'benchmark_{name}_') as workdir:
+            result_path = os.path.join(workdir, 'result.json')
+            command = [sys.executable, PIPELINE_PATH, '--result', result_path]
+            if scenario['requests_per_second'] is not None:
+                command += ['--requests-per-second', str(scenario['requests_per_second'])]
+            if scenario.get('enrich_profiles'):
+                command.append('--enrich-profiles')
+            environment = {
+                **os.environ,
+                **site.get_environment(),
+                'SCRAPER_LOG_LEVEL': 'ERROR',
+            }
+            subprocess.run(
+                command,
+                cwd=workdir,
+                env=environment,
+                check=True,
+                stdout=subprocess.DEVNULL
+            )
+            with open(result_path, encoding='utf-8') as file:
+                return json.load(file)
+    finally:
+        site.stop()
+
+def find_regressions(result: dict, baseline: dict, tolerance: float=TOLERANCE) -> list[str]:
+    regressions = []
+    for metric, higher_is_better in COMPARED_METRICS.items():
+        value, expected = result.get(metric), baseline.get(metric)
+        if value is None or expected is None:
+            continue
+        if higher_is_better and value < expected * (1 - tolerance):
+            regressions.append(f'{metric} {value:.2f} < baseline {expected:.2f}')
+        elif not higher_is_better and value > expected * (1 + tolerance):
+            regressions.append(f'{metric} {value:.2f} > baseline {expected:.2f}')
+    return regressions
+
+def load_baselines(path: str=BASELINES_PATH) -> dict:
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+def save_baselines(baselines: dict, path: str=BASELINES_PATH) -> None:
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(baselines, file, indent=2)
+        file.write('\n')
+
+def format_result(name: str, result: dict) -> str:
+    peak_rss = result['peak_rss_mb']
+    return (
+        f"{name:<24} {result['pages_per_second']:8.2f} pages/s "
+        f"{result['images_per_second']:8.2f} images/s "
+        f"{result['profiles_per_second']:8.2f} profiles/s "
+        f"{peak_rss if peak_rss is None else round(peak_rss, 1)} MB peak RSS "
+        f"({result['records']} records, {result['errors']} error responses "
+        f"in {result['seconds']:.2f}s)"
+    )
+
+
+if __name__ == '__main__':
+    argument_parser = argparse.ArgumentParser(
+        description='Benchmarks the scraper against local mock Transfermarkt servers'
+    )
+    argument_parser.add_argument(
+        '--scenario',
+        choices=SCENARIOS,
+        action='append',
+        help='scenario to run, can be repeated (default: all scenarios)'
+    )
+    argument_parser.add_argument(
+        '--update-baselines',
+        action='store_true',
+        help='store the results as the new baselines instead of comparing them'
+    )
+    arguments = argument_parser.parse_args()
+
+    baselines = load_baselines()
+    regressed = False
+    for name in arguments.scenario or SCENARIOS:
+        result = run_scenario(name, SCENARIOS[name])
+        print(format_result(name, result))
+        if arguments.update_baselines:
+            baselines[name] = {
+                metric: None if result[metric] is None else round(result[metric], 2)
+                for metric in COMPARED_METRICS
+            }
+        elif name in baselines:
+            for regression in find_regressions(result, baselines[name]):
+                print(f'  REGRESSION {regression}')
+                regressed = True
+        else:
+            print('  no baseline stored')
+    if arguments.update_baselines:
+        save_baselines(baselines)
+        print(f'Baselines have been written to {BASELINES_PATH}')
+    sys.exit(1 if regressed else 0)
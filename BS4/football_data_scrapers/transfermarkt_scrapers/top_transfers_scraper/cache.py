@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import utils
+from config import CACHE_PATH, CACHE_MAX_SIZE_BYTES, CACHE_TTL_SECONDS
+
+class ResponseCache:
+    '''
+    Keeps response bodies on disk between runs along with their
+    ETag and Last-Modified validators. Fresh entries are served
+    without contacting the server and stale ones are revalidated
+    with conditional requests. The least recently used entries are
+    evicted once the cache grows beyond its size limit.
+    '''
+    INDEX_FILENAME = 'index.json'
+
+    def __init__(
+            self,
+            cache_path: str=CACHE_PATH,
+            max_size: int=CACHE_MAX_SIZE_BYTES
+    ) -> None:
+        self.cache_path = cache_path
+        self.max_size = max_size
+        os.makedirs(self.cache_path, exist_ok=True)
+        self.index = self.load_index()
+        self.total_size = sum(entry['size'] for entry in self.index.values())
+
+    def load_index(self) -> dict:
+        '''
+        Returns the index of cached entries saved by the previous
+        run or an empty index if there is none
+        '''
+        index_path = os.path.join(self.cache_path, self.INDEX_FILENAME)
+        try:
+            with open(index_path, 'r', encoding='utf-8') as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        # Dropping entries whose bodies have been removed from disk
+        return {
+            key: entry for key, entry in index.items()
+            if os.path.exists(self.get_body_path(key))
+        }
+
+    def close(self) -> None:
+        '''
+        Writes the index to disk so the next run can use the cache
+        '''
+        index_path = os.path.join(self.cache_path, self.INDEX_FILENAME)
+        with utils.create_temp_file(self.cache_path) as file:
+            file.write(json.dumps(self.index).encode('utf-8'))
+        os.replace(file.name, index_path)
+
+    def get_key(self, url: str) -> str:
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def get_body_path(self, key: str) -> str:
+        return os.path.join(self.cache_path, key + '.body')
+
+    def get_entry(self, url: str) -> dict:
+        '''
+        Returns the cached entry for the given URL and marks it as
+        recently used. Returns None if the URL has not been cached.
+        '''
+        entry = self.index.get(self.get_key(url))
+        if entry is not None:
+            entry['last_used'] = time.time()
+        return entry
+
+    def is_fresh(self, entry: dict, request_class: str) -> bool:
+        '''
+        Checks if the entry can be used without revalidating it
+        with the server
+        '''
+        ttl = CACHE_TTL_SECONDS.get(request_class, 0)
+        return time.time() - entry['stored_at'] < ttl
+
+    def get_validators(self, entry: dict) -> dict:
+        '''
+        Returns the headers that turn a request for the cached URL
+        into a conditional request
+        '''
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def refresh(self, url: str, headers) -> None:
+        '''
+        Marks the entry for the given URL as fresh again after the
+        server has confirmed that it has not changed
+        '''
+        entry = self.index.get(self.get_key(url))
+        if entry is None:
+            return
+        entry['stored_at'] = time.time()
+        entry['etag'] = headers.get('ETag', entry.get('etag'))
+        entry['last_modified'] = headers.get(
+            'Last-Modified', entry.get('last_modified')
+        )
+
+    async def read(self, url: str) -> bytes:
+        '''
+        Returns the cached body for the given URL
+        '''
+        def read_body() -> bytes:
+            with open(self.get_body_path(self.get_key(url)), 'rb') as file:
+                return file.read()
+        return await asyncio.to_thread(read_body)
+
+    async def copy_to(self, url: str, filepath: str) -> None:
+        '''
+        Places the cached body for the given URL at the given path
+        '''
+        await asyncio.to_thread(
+            utils.link_or_copy, self.get_body_path(self.get_key(url)), filepath
+        )
+
+    async def store(self, url: str, body: bytes, headers) -> None:
+        '''
+        Caches the given response body for the given URL
+        '''
+        def write_body() -> None:
+            with utils.create_temp_file(self.cache_path) as file:
+                file.write(body)
+            os.replace(file.name, self.get_body_path(key))
+        key = self.get_key(url)
+        await asyncio.to_thread(write_body)
+        self.add_entry(key, url, len(body), headers)
+
+    async def store_file(self, url: str, filepath: str, headers) -> None:
+        '''
+        Caches the response body that has already been written to
+        the given file for the given URL
+        '''
+        key = self.get_key(url)
+        await asyncio.to_thread(
+            utils.link_or_copy, filepath, self.get_body_path(key)
+        )
+        self.add_entry(key, url, os.path.getsize(filepath), headers)
+
+    def add_entry(self, key: str, url: str, size: int, headers) -> None:
+        '''
+        Adds the entry for a newly stored body to the index and
+        evicts old entries if the cache has grown too large
+        '''
+        old_entry = self.index.get(key)
+        if old_entry is not None:
+            self.total_size -= old_entry['size']
+        now = time.time()
+        self.index[key] = {
+            'url': url,
+            'size': size,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'stored_at': now,
+            'last_used': now,
+        }
+        self.total_size += size
+        self.evict()
+
+    def evict(self) -> None:
+        '''
+        Removes the least recently used entries until the cache fits
+        in its size limit
+        '''
+        if self.total_size <= self.max_size:
+            return
+        entries = sorted(
+            self.index.items(), key=lambda item: item[1]['last_used']
+        )
+        for key, entry in entries:
+            if self.total_size <= self.max_size:
+                break
+            try:
+                os.remove(self.get_body_path(key))
+            except OSError:
+                pass
+            self.total_size -= entry['size']
+            del self.index[key]
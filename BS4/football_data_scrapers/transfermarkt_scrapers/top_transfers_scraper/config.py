@@ -1,40 +1,215 @@
-import os
-
-BASE_URL = 'https://www.transfermarkt.co.uk'
-
-# Query parameters
-# 'alle' means (to the server) that we need all seasons' data
-SEASON_ID = 'alle'
-
-# The URL for the page excluding the page number parameter that
-# will be dynamically filled in by the scraper module
-TRANSFER_PAGE_URL = BASE_URL + f'/transfers/transferrekorde/statistik/top/ajax/yw2/saison_id/{SEASON_ID}/land_id//ausrichtung//spielerposition_id//altersklasse//jahrgang/0/leihe//w_s//plus/1/galerie/0/page/'
-
-# The paths where the scraped files will be stored
-if SEASON_ID == 'alle':
-	CSV_FILE_PATH = os.path.join('All_Seasons', f'players.csv')
-	IMAGES_PATH = os.path.join('All_Seasons', f'player_images')
-else:
-	CSV_FILE_PATH = os.path.join(SEASON_ID, 'players.csv')
-	IMAGES_PATH = os.path.join(SEASON_ID, 'player_images')
-
-HEADERS_LIST = [
-			{
-				"name": "Accept",
-				"value": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/png,image/svg+xml,*/*;q=0.8"
-			},
-			{
-				"name": "Accept-Encoding",
-				"value": "gzip, deflate, br, zstd"
-			},
-			{
-				"name": "Accept-Language",
-				"value": "en-US,en;q=0.5"
-			},
-			{
-				"name": "User-Agent",
-				"value": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:129.0) Gecko/20100101 Firefox/129.0"
-			}
-]
-# Converting headers copied from the browser to a single dictionary
-HEADERS = { header['name']: header['value'] for header in HEADERS_LIST }
\ No newline at end of file
+import os
+
+# Both hosts can be pointed at local servers through the environment,
+# e.g. the mock servers of the benchmarks
+BASE_URL = os.environ.get('TRANSFERMARKT_BASE_URL', 'https://www.transfermarkt.co.uk')
+IMAGE_HOST = os.environ.get('TRANSFERMARKT_IMAGE_HOST', 'img.a.transfermarkt.technology')
+LISTING_HOST = BASE_URL.split('://')[-1]
+
+# Query parameters
+# 'alle' means (to the server) that we need all seasons' data
+SEASON_ID = 'alle'
+
+def get_transfer_page_url(season_id: str) -> str:
+	'''
+	Returns the URL for the page of the given season excluding the
+	page number parameter that will be dynamically filled in by the
+	scraper module
+	'''
+	return BASE_URL + f'/transfers/transferrekorde/statistik/top/ajax/yw2/saison_id/{season_id}/land_id//ausrichtung//spielerposition_id//altersklasse//jahrgang/0/leihe//w_s//plus/1/galerie/0/page/'
+
+def get_season_dir(season_id: str) -> str:
+	'''
+	Returns the directory where the scraped files of the given
+	season will be stored
+	'''
+	if season_id == 'alle':
+		return 'All_Seasons'
+	return str(season_id)
+
+def get_csv_file_path(season_id: str) -> str:
+	return os.path.join(get_season_dir(season_id), 'players.csv')
+
+def get_images_path(season_id: str) -> str:
+	return os.path.join(get_season_dir(season_id), 'player_images')
+
+# The URL and paths for the default season
+TRANSFER_PAGE_URL = get_transfer_page_url(SEASON_ID)
+CSV_FILE_PATH = get_csv_file_path(SEASON_ID)
+IMAGES_PATH = get_images_path(SEASON_ID)
+# Every image is downloaded once into this shared store, named
+# after the player's ID, and linked into each season's directory
+IMAGE_STORE_PATH = 'image_store'
+
+HEADERS_LIST = [
+			{
+				"name": "Accept",
+				"value": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/png,image/svg+xml,*/*;q=0.8"
+			},
+			{
+				"name": "Accept-Encoding",
+				"value": "gzip, deflate, br, zstd"
+			},
+			{
+				"name": "Accept-Language",
+				"value": "en-US,en;q=0.5"
+			},
+			{
+				"name": "User-Agent",
+				"value": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:129.0) Gecko/20100101 Firefox/129.0"
+			}
+]
+# Converting headers copied from the browser to a single dictionary.
+# Encodings in Accept-Encoding that cannot be decoded with the
+# installed packages (br needs brotli, zstd needs zstandard) are
+# dropped by the scraper before it is sent.
+HEADERS = { header['name']: header['value'] for header in HEADERS_LIST }
+
+# Request scheduling
+# Maximum number of requests that can be in flight at once for
+# each host. Hosts not listed here fall back to the default limit
+MAX_CONCURRENT_REQUESTS_PER_HOST = {
+	LISTING_HOST: 4,
+	IMAGE_HOST: 8,
+}
+DEFAULT_MAX_CONCURRENT_REQUESTS = 4
+# Steady number of requests per second allowed across all hosts
+# and the largest burst of requests that can be sent at once
+REQUESTS_PER_SECOND = 5
+REQUESTS_BURST_SIZE = 5
+
+# Transport
+# Listing pages and images are fetched with separate clients, each
+# with its own connection pool. max_connections caps the sockets
+# opened to the host and max_keepalive_connections the idle ones kept
+# open for reuse, for up to KEEPALIVE_EXPIRY_SECONDS.
+MAX_CONNECTIONS = {
+	'listing': 4,
+	'image': 8,
+}
+MAX_KEEPALIVE_CONNECTIONS = {
+	'listing': 4,
+	'image': 8,
+}
+KEEPALIVE_EXPIRY_SECONDS = 30
+# HTTP/2 sends concurrent requests as streams over a single connection.
+# Only used when the h2 package is installed (pip install httpx[http2])
+# and the server supports it, HTTP/1.1 is used otherwise.
+USE_HTTP2 = True
+
+# Retries
+# Responses with these status codes are retried, as are requests
+# that fail because of a connection error
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# Number of times a request is retried before it is given up on
+MAX_RETRIES = {
+	'listing': 5,
+	'image': 3,
+	'profile': 3,
+}
+# Retries wait a random time of up to the base delay doubled on every
+# attempt and capped at the maximum delay. A longer Retry-After header
+# sent by the server is honored.
+RETRY_BASE_DELAY_SECONDS = 1
+RETRY_MAX_DELAY_SECONDS = 60
+# Requests that failed for good are listed in this file at the end of
+# the run instead of aborting it
+DEAD_LETTER_PATH = 'dead_letters.json'
+
+# Streaming pipeline
+# Number of finished records that can wait to be stored before
+# the downloads producing them are paused
+PIPELINE_QUEUE_SIZE = 50
+# Number of records appended to the csv file at once
+CSV_BATCH_SIZE = 25
+# Whether fees, values, ages and seasons are converted to numbers
+# in the csv export instead of being kept as scraped. The Parquet
+# dataset always stores the converted values.
+NORMALIZE_RECORDS = True
+
+# Output
+# Parquet dataset shared by all seasons and partitioned by season.
+# Every run only writes the transfers that are new or have changed.
+WRITE_PARQUET = True
+DATASET_PATH = 'dataset'
+PARQUET_COMPRESSION = 'zstd'
+# Whether every season is also exported to its own csv file
+EXPORT_CSV = True
+# Size of the chunks in which images are streamed to disk
+IMAGE_CHUNK_SIZE = 64 * 1024
+
+# Image processing
+# Optional stage that converts every downloaded portrait to a common
+# size and format in a pool of worker processes. Requires Pillow.
+# Portraits that look the same (e.g. the placeholder silhouette shown
+# for players without a photo) have the same perceptual hash and are
+# stored once. The manifest maps every image in the image store to
+# its processed file.
+PROCESS_IMAGES = False
+PROCESSED_IMAGES_PATH = 'processed_images'
+IMAGE_MANIFEST_PATH = os.path.join(PROCESSED_IMAGES_PATH, 'manifest.json')
+# Images larger than this (width, height) are shrunk to fit it
+IMAGE_MAX_SIZE = (100, 130)
+# 'WEBP' or 'AVIF' (AVIF needs a Pillow build with libavif)
+IMAGE_FORMAT = 'WEBP'
+IMAGE_QUALITY = 80
+# Side of the grid used for the perceptual hash, the hash has the
+# square of it in bits
+IMAGE_HASH_SIZE = 16
+IMAGE_WORKERS = os.cpu_count()
+
+# Player profiles
+# Optional stage that follows the player page URL of every transfer
+# and adds the player's height, foot, date of birth, current club and
+# market value history to the stored transfers. Every player is only
+# fetched once per run however many transfers they appear in, and
+# profiles are kept in the profile store (one JSON file per player ID)
+# so later runs only fetch players that are new or whose profile has
+# grown older than PROFILE_MAX_AGE_SECONDS.
+ENRICH_PROFILES = False
+PROFILE_STORE_PATH = 'profile_store'
+PROFILE_MAX_AGE_SECONDS = 30 * 24 * 60 * 60
+# Number of players whose profile can be fetched at once. Profiles are
+# on the same host as listing pages, so this is kept below the host's
+# limit to leave room for listing pages.
+MAX_CONCURRENT_PROFILES = 2
+
+def get_market_value_url(player_id: str) -> str:
+	'''
+	Returns the URL of the JSON behind the market value chart of
+	the given player's profile
+	'''
+	return BASE_URL + f'/ceapi/marketValueDevelopment/graph/{player_id}'
+
+# Response cache
+# Directory in which response bodies are kept between runs
+CACHE_PATH = '.http_cache'
+CACHE_MAX_SIZE_BYTES = 500 * 1024 * 1024
+# Number of seconds for which a cached response is used without
+# asking the server again. Images rarely change so they are kept
+# fresh for much longer than listing pages.
+CACHE_TTL_SECONDS = {
+	'listing': 6 * 60 * 60,
+	'image': 30 * 24 * 60 * 60,
+	'profile': 7 * 24 * 60 * 60,
+}
+
+# Pagination
+# Pages after the first are requested before the page count has been
+# read from the first page. The page count of the previous run of the
+# season is used as a guess, or the fallback for new seasons. It is
+# also the number of pages scraped when the page count cannot be read.
+FALLBACK_PAGE_COUNT = 10
+PAGE_COUNTS_PATH = os.path.join(CACHE_PATH, 'page_counts.json')
+
+# Number of worker processes used to parse pages
+PARSER_WORKERS = os.cpu_count()
+
+# Run report
+# Metrics of every run are written as JSON and in the Prometheus
+# text format, e.g. for the textfile collector of node_exporter.
+# Set a path to None to skip that file.
+METRICS_REPORT_PATH = 'run_report.json'
+METRICS_PROMETHEUS_PATH = 'metrics.prom'
+# Upper bounds of the request latency histogram buckets in seconds
+LATENCY_BUCKETS_SECONDS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
@@ -0,0 +1,150 @@
+import os
+import asyncio
+import utils
+from concurrent.futures import ProcessPoolExecutor
+from logger import get_logger
+from metrics import metrics
+from config import (
+    PROCESSED_IMAGES_PATH,
+    IMAGE_MANIFEST_PATH,
+    IMAGE_MAX_SIZE,
+    IMAGE_FORMAT,
+    IMAGE_QUALITY,
+    IMAGE_HASH_SIZE,
+    IMAGE_WORKERS,
+)
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = get_logger('images')
+
+def get_difference_hash(image, hash_size: int=IMAGE_HASH_SIZE) -> str:
+    '''
+    Returns the difference hash of the image as a hex string. The image
+    is shrunk to a small greyscale grid and every bit tells whether a
+    pixel is brighter than its right neighbour, so images that look
+    the same get the same hash even if their files differ.
+    '''
+    grid = image.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = list(grid.getdata())
+    bits = 0
+    for row in range(hash_size):
+        for column in range(hash_size):
+            left = pixels[row * (hash_size + 1) + column]
+            right = pixels[row * (hash_size + 1) + column + 1]
+            bits = (bits << 1) | (left > right)
+    return f'{bits:0{hash_size * hash_size // 4}x}'
+
+def process_image(
+        source_path: str,
+        output_path: str=PROCESSED_IMAGES_PATH,
+        max_size: tuple=IMAGE_MAX_SIZE,
+        image_format: str=IMAGE_FORMAT,
+        quality: int=IMAGE_QUALITY
+) -> dict:
+    '''
+    Resizes the image to fit the maximum size and saves it in the
+    given format under its perceptual hash, so identical portraits
+    such as the placeholder silhouette are only stored once. Meant to
+    be run in the worker processes of the image pool.
+    '''
+    with Image.open(source_path) as image:
+        image_hash = get_difference_hash(image)
+        filename = f'{image_hash}.{image_format.lower()}'
+        filepath = os.path.join(output_path, filename)
+        if not os.path.exists(filepath):
+            if image.mode not in ('RGB', 'RGBA'):
+                has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+                image = image.convert('RGBA' if has_alpha else 'RGB')
+            image.thumbnail(max_size, Image.LANCZOS)
+            # Saved under a temporary name first so another worker
+            # saving the same hash never sees a half written file
+            temp_path = f'{filepath}.{os.getpid()}.part'
+            image.save(temp_path, image_format, quality=quality)
+            os.replace(temp_path, filepath)
+        with Image.open(filepath) as processed_image:
+            width, height = processed_image.size
+    return {
+        'processed_image': filename,
+        'hash': image_hash,
+        'width': width,
+        'height': height,
+        'original_bytes': os.path.getsize(source_path),
+        'processed_bytes': os.path.getsize(filepath),
+    }
+
+
+class ImageProcessor:
+    '''
+    Normalizes downloaded portraits in a pool of worker processes and
+    keeps a manifest of every processed image keyed by its filename
+    in the image store. Images already in the manifest are skipped.
+    '''
+    def __init__(self, manifest_path: str=IMAGE_MANIFEST_PATH) -> None:
+        self.manifest_path = manifest_path
+        self.manifest = utils.read_json(manifest_path, {})
+        self.tasks = {}
+        self.image_format = IMAGE_FORMAT.upper()
+        Image.init()
+        if self.image_format not in Image.SAVE:
+            logger.warning(
+                f'Pillow cannot write {self.image_format} images, using WEBP instead'
+            )
+            self.image_format = 'WEBP'
+        os.makedirs(PROCESSED_IMAGES_PATH, exist_ok=True)
+        self.pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+
+    def submit(self, store_path: str) -> None:
+        '''
+        Starts processing the image at the given path of the image
+        store unless it has been processed before
+        '''
+        store_filename = os.path.basename(store_path)
+        if store_filename in self.tasks:
+            return
+        entry = self.manifest.get(store_filename)
+        if entry is not None and os.path.exists(
+            os.path.join(PROCESSED_IMAGES_PATH, entry['processed_image'])
+        ):
+            return
+        self.tasks[store_filename] = asyncio.create_task(
+            self.process(store_path, store_filename)
+        )
+
+    async def process(self, store_path: str, store_filename: str) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            with metrics.timer('image', 'process'):
+                entry = await loop.run_in_executor(
+                    self.pool,
+                    process_image,
+                    store_path,
+                    PROCESSED_IMAGES_PATH,
+                    IMAGE_MAX_SIZE,
+                    self.image_format
+                )
+        except Exception as error:
+            logger.warning(
+                'Could not process image',
+                extra={'path': store_path, 'error': error}
+            )
+            return
+        self.manifest[store_filename] = entry
+
+    async def close(self) -> None:
+        '''
+        Waits for the images being processed, writes the manifest and
+        stops the worker processes
+        '''
+        await asyncio.gather(*self.tasks.values())
+        await asyncio.to_thread(utils.write_json, self.manifest_path, self.manifest)
+        self.pool.shutdown()
+        if self.tasks:
+            processed = sum(name in self.manifest for name in self.tasks)
+            processed_files = {entry['processed_image'] for entry in self.manifest.values()}
+            logger.info(
+                f'{processed} images have been processed, the manifest '
+                f'lists {len(self.manifest)} images stored as {len(processed_files)} files'
+            )
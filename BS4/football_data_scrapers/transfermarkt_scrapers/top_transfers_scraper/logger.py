@@ -0,0 +1,21 @@
+import os
+import importlib.util
+
+'''
+The logger is shared with the league data scraper. Both scrapers are
+run as scripts from their own directories, so the shared module is
+loaded from its file instead of being imported as a package.
+'''
+
+SHARED_LOGGER_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir,
+    'league_data_scraper',
+    'logger.py'
+)
+
+spec = importlib.util.spec_from_file_location('shared_logger', SHARED_LOGGER_PATH)
+shared_logger = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(shared_logger)
+
+get_logger = shared_logger.get_logger
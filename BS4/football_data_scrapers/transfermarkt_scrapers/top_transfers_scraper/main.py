@@ -1,18 +1,75 @@
-import time
-import asyncio
-from storage import DataStorage
-from scraper import TransferScraper
-
-async def main():
-    start_time = time.time()
-
-    scraper = TransferScraper()
-    records = await scraper.scrape()
-    storage = DataStorage()
-    storage.save(records)
-
-    print(f'--- Time taken to execute : {time.time() - start_time}s ---')
-
-
-if __name__ == '__main__':
-    asyncio.run(main())
\ No newline at end of file
+import time
+import asyncio
+import argparse
+from contextlib import aclosing
+from config import SEASON_ID, get_csv_file_path
+from storage import DataStorage
+from scraper import TransferScraper
+from metrics import metrics
+
+def parse_seasons(seasons: str) -> list[str]:
+    '''
+    Returns the list of season IDs described by the given argument.
+    A range of years such as 1975-2023 includes both ends and any
+    other value is treated as a single season ID.
+    '''
+    if '-' in seasons:
+        first_season, last_season = seasons.split('-')
+        return [
+            str(season)
+            for season in range(int(first_season), int(last_season) + 1)
+        ]
+    return [seasons]
+
+async def scrape_season(scraper: TransferScraper, season_id: str) -> None:
+    '''
+    Scrapes a single season and writes it to its own directory
+    '''
+    storage = DataStorage(get_csv_file_path(season_id))
+    try:
+        # Records are stored as soon as they are scraped. The records
+        # are closed right away if saving fails, so the season's pending
+        # requests are stopped before the scraper is closed.
+        async with aclosing(scraper.scrape(season_id)) as records:
+            async for record in records:
+                await storage.save(record)
+    finally:
+        # Records scraped before a failure are still written
+        await storage.close()
+
+async def main():
+    argument_parser = argparse.ArgumentParser(
+        description='Scrapes the most expensive transfers of one or more seasons'
+    )
+    argument_parser.add_argument(
+        '--seasons',
+        default=SEASON_ID,
+        help="season ID or range of season start years, e.g. 1975-2023 (default: '%(default)s')"
+    )
+    arguments = argument_parser.parse_args()
+    start_time = time.time()
+
+    # All seasons share one scraper so they use the same connection
+    # pool and the same concurrency limits
+    scraper = TransferScraper()
+    seasons = [
+        asyncio.create_task(scrape_season(scraper, season_id))
+        for season_id in parse_seasons(arguments.seasons)
+    ]
+    try:
+        await asyncio.gather(*seasons)
+    finally:
+        # The other seasons are stopped if one fails, and the cache
+        # index, page counts, dead letters and reports are written
+        # either way
+        for season in seasons:
+            season.cancel()
+        await asyncio.gather(*seasons, return_exceptions=True)
+        await scraper.close()
+        metrics.write_reports()
+
+    print(f'--- Time taken to execute : {time.time() - start_time}s ---')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
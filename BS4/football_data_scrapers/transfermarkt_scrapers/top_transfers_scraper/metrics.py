@@ -0,0 +1,214 @@
+import os
+import json
+import time
+from contextlib import contextmanager
+from collections import Counter, defaultdict
+from config import (
+    LATENCY_BUCKETS_SECONDS,
+    METRICS_REPORT_PATH,
+    METRICS_PROMETHEUS_PATH,
+)
+
+'''
+Counters and timings collected during a run. Requests are grouped by
+request class (listing pages and images) and time is split into the
+phases a run spends it in: network, parse and disk. Times of requests
+running concurrently are added up, so phase totals can be larger than
+the duration of the run.
+'''
+
+class Histogram:
+    '''
+    Cumulative histogram with fixed bucket bounds, in the layout used
+    by Prometheus
+    '''
+    def __init__(self, bounds: tuple=LATENCY_BUCKETS_SECONDS) -> None:
+        self.bounds = bounds
+        self.bucket_counts = [0] * len(bounds)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.bucket_counts[index] += 1
+
+    def as_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'buckets': {
+                str(bound): count
+                for bound, count in zip(self.bounds, self.bucket_counts)
+            },
+        }
+
+
+class RunMetrics:
+    '''
+    Collects the metrics of a single run. Everything is updated from
+    the event loop thread so no locking is needed.
+    '''
+    def __init__(self) -> None:
+        self.started_at = time.time()
+        self.latency = defaultdict(Histogram)
+        self.bytes_received = Counter()
+        self.status_codes = defaultdict(Counter)
+        self.cache_hits = Counter()
+        self.retries = Counter()
+        self.dead_letters = Counter()
+        # Seconds keyed by (request class, phase)
+        self.phase_seconds = Counter()
+        self.records_written = 0
+
+    def observe_response(
+            self,
+            request_class: str,
+            seconds: float,
+            status_code: int,
+            size: int
+    ) -> None:
+        '''
+        Records a response received from the server
+        '''
+        self.latency[request_class].observe(seconds)
+        self.bytes_received[request_class] += size
+        self.status_codes[request_class][status_code] += 1
+        self.phase_seconds[request_class, 'network'] += seconds
+
+    def observe_cache_hit(self, request_class: str) -> None:
+        self.cache_hits[request_class] += 1
+
+    def observe_retry(self, request_class: str) -> None:
+        self.retries[request_class] += 1
+
+    def observe_dead_letter(self, request_class: str) -> None:
+        self.dead_letters[request_class] += 1
+
+    def add_time(self, request_class: str, phase: str, seconds: float) -> None:
+        self.phase_seconds[request_class, phase] += seconds
+
+    @contextmanager
+    def timer(self, request_class: str, phase: str):
+        '''
+        Adds the time spent in the with block to the given phase
+        '''
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(request_class, phase, time.perf_counter() - started)
+
+    def as_dict(self) -> dict:
+        '''
+        Returns the metrics as a dictionary meant to be written as JSON
+        '''
+        request_classes = sorted(
+            set(self.latency) | set(self.cache_hits)
+            | {request_class for request_class, _ in self.phase_seconds}
+        )
+        report = {
+            'started_at': self.started_at,
+            'duration_seconds': round(time.time() - self.started_at, 6),
+            'records_written': self.records_written,
+            'request_classes': {},
+        }
+        for request_class in request_classes:
+            class_report = {}
+            # Classes such as records only have phase timings
+            if request_class in self.latency or request_class in self.cache_hits:
+                class_report['latency_seconds'] = self.latency[request_class].as_dict()
+                class_report['bytes_received'] = self.bytes_received[request_class]
+                class_report['status_codes'] = {
+                    str(status_code): count
+                    for status_code, count in sorted(self.status_codes[request_class].items())
+                }
+                class_report['cache_hits'] = self.cache_hits[request_class]
+                class_report['retries'] = self.retries[request_class]
+                class_report['dead_letters'] = self.dead_letters[request_class]
+            class_report['phase_seconds'] = {
+                phase: round(seconds, 6)
+                for (name, phase), seconds in sorted(self.phase_seconds.items())
+                if name == request_class
+            }
+            report['request_classes'][request_class] = class_report
+        return report
+
+    def as_prometheus(self) -> str:
+        '''
+        Returns the metrics in the Prometheus text exposition format
+        '''
+        lines = [
+            '# TYPE scraper_request_duration_seconds histogram',
+        ]
+        for request_class, histogram in sorted(self.latency.items()):
+            for bound, count in zip(histogram.bounds, histogram.bucket_counts):
+                lines.append(
+                    f'scraper_request_duration_seconds_bucket'
+                    f'{{class="{request_class}",le="{bound}"}} {count}'
+                )
+            lines.append(
+                f'scraper_request_duration_seconds_bucket'
+                f'{{class="{request_class}",le="+Inf"}} {histogram.count}'
+            )
+            lines.append(f'scraper_request_duration_seconds_sum{{class="{request_class}"}} {histogram.sum}')
+            lines.append(f'scraper_request_duration_seconds_count{{class="{request_class}"}} {histogram.count}')
+        lines.append('# TYPE scraper_response_bytes_total counter')
+        for request_class, size in sorted(self.bytes_received.items()):
+            lines.append(f'scraper_response_bytes_total{{class="{request_class}"}} {size}')
+        lines.append('# TYPE scraper_responses_total counter')
+        for request_class, status_codes in sorted(self.status_codes.items()):
+            for status_code, count in sorted(status_codes.items()):
+                lines.append(
+                    f'scraper_responses_total'
+                    f'{{class="{request_class}",status="{status_code}"}} {count}'
+                )
+        lines.append('# TYPE scraper_cache_hits_total counter')
+        for request_class, count in sorted(self.cache_hits.items()):
+            lines.append(f'scraper_cache_hits_total{{class="{request_class}"}} {count}')
+        lines.append('# TYPE scraper_retries_total counter')
+        for request_class, count in sorted(self.retries.items()):
+            lines.append(f'scraper_retries_total{{class="{request_class}"}} {count}')
+        lines.append('# TYPE scraper_dead_letters_total counter')
+        for request_class, count in sorted(self.dead_letters.items()):
+            lines.append(f'scraper_dead_letters_total{{class="{request_class}"}} {count}')
+        lines.append('# TYPE scraper_phase_seconds_total counter')
+        for (request_class, phase), seconds in sorted(self.phase_seconds.items()):
+            lines.append(
+                f'scraper_phase_seconds_total'
+                f'{{class="{request_class}",phase="{phase}"}} {seconds}'
+            )
+        lines.append('# TYPE scraper_records_written_total counter')
+        lines.append(f'scraper_records_written_total {self.records_written}')
+        return '\n'.join(lines) + '\n'
+
+    def write_reports(
+            self,
+            report_path: str=METRICS_REPORT_PATH,
+            prometheus_path: str=METRICS_PROMETHEUS_PATH
+    ) -> None:
+        '''
+        Writes the JSON report and the Prometheus text file. Either
+        path can be None to skip that file.
+        '''
+        if report_path is not None:
+            write_atomically(report_path, json.dumps(self.as_dict(), indent=2))
+        if prometheus_path is not None:
+            write_atomically(prometheus_path, self.as_prometheus())
+
+
+def write_atomically(path: str, text: str) -> None:
+    '''
+    Writes the text to a temporary file next to the given path and
+    renames it so readers of the file never see half a report
+    '''
+    temp_path = f'{path}.part'
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        file.write(text)
+    os.replace(temp_path, path)
+
+
+# Shared by the scraper and the storage of a run
+metrics = RunMetrics()
@@ -0,0 +1,58 @@
+from dataclasses import dataclass, fields
+
+@dataclass(slots=True)
+class TransferRecord:
+    '''
+    A single transfer. Slots keep every record small since large
+    backfills hold many of them at once. The fields up to
+    transfer_fee_in_euros are in the order of the tuples returned
+    by TransferParser so a record can be built directly from one.
+    '''
+    player_name: str
+    player_page_url: str
+    player_image_url: str
+    player_position: str
+    player_age: str
+    player_value_in_euros: str
+    season: str
+    player_nationalities: tuple
+    old_club_name: str
+    old_league_name: str
+    new_club_name: str
+    new_league_name: str
+    transfer_fee_in_euros: str
+    # Filename of the downloaded image, None if it could not be downloaded
+    player_image: str = None
+    # Fields of PROFILE_FIELDS read from the player's profile, None if
+    # profiles are not enriched or it could not be fetched
+    player_profile: dict = None
+
+    def as_row(self) -> tuple:
+        '''
+        Returns the values of the record in the order of its fields
+        without copying nested values
+        '''
+        return tuple(getattr(self, name) for name in RECORD_FIELDS)
+
+
+# Names of the values returned by TransferRecord.as_row, in order
+RECORD_FIELDS = tuple(field.name for field in fields(TransferRecord))
+# Details of a player added to their transfers by the optional
+# profile enrichment stage
+PROFILE_FIELDS = (
+    'player_height_in_cm',
+    'player_foot',
+    'player_date_of_birth',
+    'player_current_club',
+    'player_market_value_history',
+)
+# Types of the profile columns, set on every batch so batches without
+# any profile have the same column types as the others. The market
+# value history is stored as JSON text as it is a list of points.
+PROFILE_FIELD_TYPES = {
+    'player_height_in_cm': 'Int64',
+    'player_foot': 'string',
+    'player_date_of_birth': 'string',
+    'player_current_club': 'string',
+    'player_market_value_history': 'string',
+}
@@ -1,140 +1,191 @@
-from bs4 import BeautifulSoup
-from config import BASE_URL, TRANSFER_PAGE_URL
-
-class TransferParser:
-    def parse(self, html: str) -> list[dict]:
-        '''
-        Returns the list of transfer records after extracting data
-        from the given BeautifulSoup object
-        '''
-        soup = BeautifulSoup(html, 'html.parser')
-        players_table = soup.find('table', {'class': 'items'})
-        player_rows = players_table.find_all('tr', {'class': ['odd', 'even']})
-        all_data = []
-        for row in player_rows:
-            player_data = self.parse_row(row)
-            all_data.append(player_data)
-        return all_data
-    
-
-    def parse_row(self, row: BeautifulSoup) -> dict:
-        '''
-        Returns a complete record of the transfer after parsing
-        the passed BeautifulSoup object of a single table row.
-        '''
-        cells = row.find_all('td', recursive=False)
-        name_position_image = cells[1]
-        age = cells[2]
-        market_value = cells[3]
-        season = cells[4]
-        nationality = cells[5]
-        old_club = cells[6]
-        new_club = cells[7]
-        transfer_fee = cells[8]
-
-        transfer_data = {}
-        transfer_data['player_name'] = self.safe_extract(
-            lambda: name_position_image.find('a').get_text().strip(),
-            'Could not retrieve player name'
-        )
-        transfer_data['player_page_url'] = self.safe_extract(
-            lambda: BASE_URL + name_position_image.find('a')['href'],
-            'Could not retrieve player page URL'
-        )
-        transfer_data['player_image_url'] = self.safe_extract(
-            lambda: name_position_image.find('img')['data-src'],
-            'Could not retrieve player image URL'
-        )
-        transfer_data['player_position'] = self.safe_extract(
-            lambda: name_position_image.find_all('tr')[1].get_text().strip(),
-            'Could not retrieve player position'
-        )
-        transfer_data['player_age'] = self.safe_extract(
-            lambda: age.get_text().strip(),
-            'Could not retrieve player age'
-        )
-        transfer_data['player_value_in_euros'] = self.safe_extract(
-            lambda: market_value.get_text().strip(),
-            'Could not retrieve player value'
-        )
-        transfer_data['season'] = self.safe_extract(
-            lambda: season.find('a').get_text().strip(),
-            'Could not retrieve transfer season'
-        )
-        transfer_data['player_nationalities'] = self.safe_extract(
-            lambda: [country['title'] for country in nationality.find_all('img')],
-            'Could not retrieve player nationalities'
-        )
-        old_club_info = self.safe_extract(
-            lambda: old_club.find_all('tr'),
-            'Could not retrieve old club data'
-        )
-        transfer_data['old_club_name'] = self.safe_extract(
-            lambda: old_club_info[0].find('a')['title'],
-            'Could not retrieve old club name'
-        )
-        transfer_data['old_league_name'] = self.safe_extract(
-            lambda: old_club_info[1].find('a')['title'],
-            'Could not retrieve old league name'
-        )
-        new_club_info = self.safe_extract(
-            lambda: new_club.find_all('tr'),
-            'Could not retrieve new club info'
-        )
-        transfer_data['new_club_name'] = self.safe_extract(
-            lambda: new_club_info[0].find('a')['title'],
-            'Could not retrieve new club name'
-        )
-        transfer_data['new_league_name'] = self.safe_extract(
-            lambda: new_club_info[1].find('a')['title'],
-            'Could not retrieve new league name'
-        )
-        transfer_data['transfer_fee_in_euros'] = self.safe_extract(
-            lambda: transfer_fee.find('a').get_text().strip(),
-            'Could not retrieve transfer fee'
-        )
-        return transfer_data
-    
-    def safe_extract(
-            self,
-            function: callable,
-            error_message: str,
-            default_value:str='MISSING VALUE'
-    ) -> str:
-        '''
-        Executes the given function and returns its result. In
-        case of an expection, returns the default value and prints
-        an error message to the terminal
-        '''
-        try:
-            return function()
-        except Exception as e:
-            print(error_message)
-            return default_value
-     
-    def get_urls_from_pagination(self, html: str) -> list[str]:
-        '''
-        Takes a page's HTML file, determines how many total pages
-        need to be scraped from the pagination list and returns a
-        list of URLs of the pages
-        '''
-        soup = BeautifulSoup(html, 'html.parser')
-        try:
-            list_of_pages = [
-                li for li in soup.find_all(
-                    'li', {'class': 'tm-pagination__list-item'})
-                    if li.get('class') == ['tm-pagination__list-item']
-            ]
-            page_number = int(
-                list_of_pages[-1].find(
-                    'a', {'class': 'tm-pagination__link'}
-                    ).get_text().strip()
-            )
-            urls = [
-                TRANSFER_PAGE_URL + str(page)
-                for page in range(1, page_number + 1)
-            ]
-            return urls
-        except:
-            print(f'There was an error while determining number of pages')
-            return None
\ No newline at end of file
+import re
+import json
+import datetime
+from bs4 import BeautifulSoup
+from schema import TRANSFER_SCHEMA, MISSING_VALUE
+from logger import get_logger
+from row_extractor import LxmlRowExtractor, SoupRowExtractor, lxml_html
+
+logger = get_logger('parser')
+
+# Finds the links of the pagination list. Only the numbered ones are
+# used, which includes the current page but not the arrows.
+PAGE_LINKS_XPATH = (
+    "//li[contains(concat(' ', normalize-space(@class), ' '), ' tm-pagination__list-item ')]"
+    "/a[contains(concat(' ', normalize-space(@class), ' '), ' tm-pagination__link ')]"
+)
+
+class LxmlTransferExtractor(LxmlRowExtractor):
+    '''
+    Extracts transfer tuples with lxml and reads the number of pages
+    from the pagination list
+    '''
+    def __init__(self) -> None:
+        super().__init__(TRANSFER_SCHEMA, MISSING_VALUE)
+
+    def get_page_count(self, document) -> int:
+        return get_highest_page_number(
+            link.text_content() for link in document.xpath(PAGE_LINKS_XPATH)
+        )
+
+
+class SoupTransferExtractor(SoupRowExtractor):
+    '''
+    Extracts transfer tuples with BeautifulSoup. Used when lxml is not
+    installed.
+    '''
+    def __init__(self) -> None:
+        super().__init__(TRANSFER_SCHEMA, MISSING_VALUE)
+
+    def get_page_count(self, soup: BeautifulSoup) -> int:
+        return get_highest_page_number(
+            link.get_text()
+            for link in soup.select('li.tm-pagination__list-item > a.tm-pagination__link')
+        )
+
+
+def get_highest_page_number(link_texts) -> int:
+    '''
+    Returns the highest page number among the texts of the links of
+    the pagination list. Raises a ValueError if there is none.
+    '''
+    return max(
+        int(text.strip()) for text in link_texts if text.strip().isdigit()
+    )
+
+class TransferParser:
+    def __init__(self) -> None:
+        '''
+        Compiles the transfer schema with lxml, falling back to
+        BeautifulSoup when lxml is not available
+        '''
+        if lxml_html is not None:
+            self.extractor = LxmlTransferExtractor()
+        else:
+            self.extractor = SoupTransferExtractor()
+
+    def parse(self, html: bytes) -> list[tuple]:
+        '''
+        Returns the list of transfer records after extracting data
+        from the given HTML. Each record is a tuple of the values
+        named in TRANSFER_FIELDS.
+        '''
+        return self.extractor.extract(html)
+
+    def parse_first_page(self, html: bytes) -> tuple[list[tuple], int]:
+        '''
+        Returns the transfer records of the first page along with the
+        number of pages read from its pagination list, or None if the
+        number could not be determined. The page is only parsed once
+        for both.
+        '''
+        document = self.extractor.load(html)
+        return self.extractor.extract_rows(document), self.get_page_count(document)
+
+    def get_page_count(self, document) -> int:
+        try:
+            return self.extractor.get_page_count(document)
+        except Exception:
+            logger.error('There was an error while determining number of pages')
+            return None
+
+
+# Labels of the player profile's info table, matched up to the first
+# colon or slash (e.g. 'Date of birth/Age:'), and the profile fields
+# their values are stored in
+PROFILE_LABELS = {
+    'date of birth': 'player_date_of_birth',
+    'height': 'player_height_in_cm',
+    'foot': 'player_foot',
+    'current club': 'player_current_club',
+}
+# Date formats used for the date of birth by the different language
+# versions of the site
+DATE_OF_BIRTH_FORMATS = ('%d/%m/%Y', '%b %d, %Y', '%d.%m.%Y')
+
+class ProfileParser:
+    '''
+    Extracts the details of a player from their profile page and
+    their market value history from the JSON behind its chart
+    '''
+    def parse(self, html: bytes) -> dict:
+        '''
+        Returns the fields of PROFILE_LABELS found in the profile's
+        info table. Fields that are not listed are left out.
+        '''
+        soup = BeautifulSoup(html, 'html.parser')
+        profile = {}
+        for label in soup.select('span.info-table__content--regular'):
+            name = re.split(r'[:/]', label.get_text(strip=True))[0].strip().lower()
+            value = label.find_next_sibling('span', class_='info-table__content--bold')
+            if name not in PROFILE_LABELS or value is None:
+                continue
+            field = PROFILE_LABELS[name]
+            text = ' '.join(value.stripped_strings)
+            try:
+                if field == 'player_height_in_cm':
+                    profile[field] = parse_height(text)
+                elif field == 'player_date_of_birth':
+                    profile[field] = parse_date_of_birth(text)
+                else:
+                    profile[field] = text
+            except ValueError:
+                logger.warning(f"Could not retrieve {field.replace('_', ' ')}")
+        return profile
+
+    def parse_market_value_history(self, body: bytes) -> list[dict]:
+        '''
+        Returns the points of the market value chart as dates (in ISO
+        format), whole euros and the club the player was at
+        '''
+        points = json.loads(body).get('list', [])
+        return [
+            {
+                'date': datetime.datetime.fromtimestamp(
+                    point['x'] / 1000, datetime.timezone.utc
+                ).date().isoformat(),
+                'value_in_euros': int(point['y']),
+                'club': point.get('verein'),
+            }
+            for point in points
+        ]
+
+
+def parse_height(text: str) -> int:
+    '''
+    Converts a height such as 1,78 m to centimetres
+    '''
+    metres = float(text.replace('m', '').replace(',', '.').strip())
+    return round(metres * 100)
+
+def parse_date_of_birth(text: str) -> str:
+    '''
+    Converts a date of birth such as 20/12/1998 (25) to ISO format.
+    The age in brackets is dropped.
+    '''
+    text = text.split('(')[0].strip()
+    for date_format in DATE_OF_BIRTH_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, date_format).date().isoformat()
+        except ValueError:
+            pass
+    raise ValueError(text)
+
+
+# Functions meant to be run in the worker processes of the scraper's
+# process pool. They take raw response bodies and only return plain
+# values so that little data has to be sent between processes.
+worker_parser = TransferParser()
+worker_profile_parser = ProfileParser()
+
+def parse_page(html: bytes) -> list[tuple]:
+    return worker_parser.parse(html)
+
+def parse_first_page(html: bytes) -> tuple[list[tuple], int]:
+    return worker_parser.parse_first_page(html)
+
+def parse_profile(html: bytes) -> dict:
+    return worker_profile_parser.parse(html)
+
+def parse_market_value_history(body: bytes) -> list[dict]:
+    return worker_profile_parser.parse_market_value_history(body)
@@ -0,0 +1,120 @@
+import os
+import time
+import asyncio
+import utils
+from models import PROFILE_FIELDS
+from parser import parse_profile, parse_market_value_history
+from logger import get_logger
+from metrics import metrics
+from config import (
+    PROFILE_STORE_PATH,
+    PROFILE_MAX_AGE_SECONDS,
+    MAX_CONCURRENT_PROFILES,
+    get_market_value_url,
+)
+
+logger = get_logger('profiles')
+
+class ProfileEnricher:
+    '''
+    Fetches the profile of every player once and keeps it in the
+    profile store. Players appearing in several transfers or seasons
+    share one fetch and stored profiles are read from disk while they
+    are fresh. Fetches have their own concurrency limit on top of the
+    scraper's scheduler so they never take all of the listing host's
+    slots.
+    '''
+    def __init__(self, scraper, store_path: str=PROFILE_STORE_PATH) -> None:
+        self.scraper = scraper
+        self.store_path = store_path
+        self.semaphore = asyncio.Semaphore(MAX_CONCURRENT_PROFILES)
+        # Profile tasks keyed by player ID
+        self.tasks = {}
+        self.profiles_fetched = 0
+        self.profiles_stored = 0
+        os.makedirs(store_path, exist_ok=True)
+
+    def submit(self, player_page_url: str) -> asyncio.Task:
+        '''
+        Returns the task getting the profile of the player at the given
+        URL, starting it unless it was started for an earlier transfer.
+        Returns None for URLs without a player ID.
+        '''
+        player_id = utils.get_player_id(player_page_url)
+        if player_id is None:
+            return None
+        if player_id not in self.tasks:
+            self.tasks[player_id] = asyncio.create_task(
+                self.get_profile(player_id, player_page_url)
+            )
+        return self.tasks[player_id]
+
+    def get_store_path(self, player_id: str) -> str:
+        return os.path.join(self.store_path, f'{player_id}.json')
+
+    async def get_profile(self, player_id: str, player_page_url: str) -> dict:
+        '''
+        Returns the profile fields of the given player, from the profile
+        store if it is fresh and from the site otherwise. Returns None
+        if the profile could not be fetched.
+        '''
+        store_path = self.get_store_path(player_id)
+        with metrics.timer('profile', 'disk'):
+            stored = await asyncio.to_thread(utils.read_json, store_path, None)
+        if stored is not None and time.time() - stored.get('fetched_at', 0) < PROFILE_MAX_AGE_SECONDS:
+            self.profiles_stored += 1
+            return {name: stored.get(name) for name in PROFILE_FIELDS}
+        try:
+            profile = await self.fetch_profile(player_id, player_page_url)
+            # Failed requests have been added to the dead letters by
+            # the scraper
+            if profile is None:
+                return None
+            self.profiles_fetched += 1
+            with metrics.timer('profile', 'disk'):
+                await asyncio.to_thread(
+                    utils.write_json,
+                    store_path,
+                    {'player_id': player_id, 'fetched_at': time.time(), **profile}
+                )
+        except Exception as error:
+            self.scraper.add_dead_letter(player_page_url, str(error) or type(error).__name__)
+            return None
+        return profile
+
+    async def fetch_profile(self, player_id: str, player_page_url: str) -> dict:
+        '''
+        Fetches the profile page and the market value history of the
+        given player and returns their fields. Returns None if either
+        request failed, so the player is tried again by the next run
+        instead of being stored without them.
+        '''
+        async with self.semaphore:
+            html, market_values = await asyncio.gather(
+                self.scraper.fetch_url(player_page_url),
+                self.scraper.fetch_url(get_market_value_url(player_id)),
+            )
+        if html is None or market_values is None:
+            return None
+        with metrics.timer('profile', 'parse'):
+            profile = await self.scraper.run_in_parse_pool(parse_profile, html)
+            profile['player_market_value_history'] = await self.scraper.run_in_parse_pool(
+                parse_market_value_history, market_values
+            )
+        return {name: profile.get(name) for name in PROFILE_FIELDS}
+
+    async def close(self) -> None:
+        '''
+        Waits for the profiles being fetched and reports how many
+        players have been enriched
+        '''
+        # Failed profiles have been added to the dead letters by
+        # get_profile or by the scraper's failed requests
+        profiles = await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+        if self.tasks:
+            failed = sum(not isinstance(profile, dict) for profile in profiles)
+            logger.info(
+                f'{self.profiles_fetched} profiles have been fetched and '
+                f'{self.profiles_stored} read from {self.store_path}, '
+                f'{failed} could not be fetched'
+            )
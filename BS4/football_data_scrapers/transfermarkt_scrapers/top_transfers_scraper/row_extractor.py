@@ -0,0 +1,25 @@
+import os
+import importlib.util
+
+'''
+The row extractor is shared with the league data scraper and loaded
+from its file in the same way as the logger (see logger.py)
+'''
+
+SHARED_ROW_EXTRACTOR_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir,
+    'league_data_scraper',
+    'row_extractor.py'
+)
+
+spec = importlib.util.spec_from_file_location('shared_row_extractor', SHARED_ROW_EXTRACTOR_PATH)
+shared_row_extractor = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(shared_row_extractor)
+
+Field = shared_row_extractor.Field
+strip = shared_row_extractor.strip
+prefix_with = shared_row_extractor.prefix_with
+lxml_html = shared_row_extractor.lxml_html
+LxmlRowExtractor = shared_row_extractor.LxmlRowExtractor
+SoupRowExtractor = shared_row_extractor.SoupRowExtractor
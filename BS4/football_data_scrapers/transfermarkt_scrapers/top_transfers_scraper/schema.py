@@ -0,0 +1,32 @@
+from config import BASE_URL
+from row_extractor import Field, strip, prefix_with
+
+'''
+Declares where every field of a transfer is found in a row of the
+transfers table. This is the only place that needs to change when
+Transfermarkt changes the layout of the table.
+'''
+
+add_base_url = prefix_with(BASE_URL)
+
+TRANSFER_SCHEMA = (
+    Field('player_name', 1, '(.//a)[1]', 'a', None, False, strip),
+    Field('player_page_url', 1, '(.//a)[1]', 'a', 'href', False, add_base_url),
+    Field('player_image_url', 1, '(.//img)[1]', 'img', 'data-src', False, None),
+    Field('player_position', 1, '(.//tr)[2]', ':scope tr:nth-of-type(2)', None, False, strip),
+    Field('player_age', 2, '.', None, None, False, strip),
+    Field('player_value_in_euros', 3, '.', None, None, False, strip),
+    Field('season', 4, '(.//a)[1]', 'a', None, False, strip),
+    Field('player_nationalities', 5, './/img', 'img', 'title', True, tuple),
+    Field('old_club_name', 6, '((.//tr)[1]//a)[1]', ':scope tr:nth-of-type(1) a', 'title', False, None),
+    Field('old_league_name', 6, '((.//tr)[2]//a)[1]', ':scope tr:nth-of-type(2) a', 'title', False, None),
+    Field('new_club_name', 7, '((.//tr)[1]//a)[1]', ':scope tr:nth-of-type(1) a', 'title', False, None),
+    Field('new_league_name', 7, '((.//tr)[2]//a)[1]', ':scope tr:nth-of-type(2) a', 'title', False, None),
+    Field('transfer_fee_in_euros', 8, '(.//a)[1]', 'a', None, False, strip),
+)
+
+# Value of the fields that could not be extracted from a row
+MISSING_VALUE = 'MISSING VALUE'
+
+# Names of the values in every parsed transfer tuple, in order
+TRANSFER_FIELDS = tuple(field.name for field in TRANSFER_SCHEMA)
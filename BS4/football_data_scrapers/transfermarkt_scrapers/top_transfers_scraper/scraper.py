@@ -1,71 +1,618 @@
-import httpx
-import utils
-import asyncio
-from parser import TransferParser
-from config import HEADERS, TRANSFER_PAGE_URL
-
-class TransferScraper:
-    '''
-    Meant to handle communication with the server
-    '''
-    def __init__(self) -> None:
-        '''
-        Creates a session to be used throughout the program and
-        includes the headers from the config file
-        '''
-        self.client = httpx.AsyncClient(headers=HEADERS, timeout=None)
-    
-    async def scrape(self) -> list[dict]:
-        '''
-        Returns a list of records obtained after parsing all
-        URLs
-        '''
-        parser = TransferParser()
-        all_data = []
-        # Fetch the HTML for the first URL and determine from the
-        # pagination list how many pages need to be scraped
-        first_page_html = await self.fetch_url(TRANSFER_PAGE_URL + str(1))
-        urls = parser.get_urls_from_pagination(first_page_html)
-        if urls is None:
-            urls = [
-                TRANSFER_PAGE_URL + str(page)
-                for page in range(1, 10 + 1)
-            ]
-        tasks = [self.fetch_url(url) for url in urls]
-        all_htmls = await asyncio.gather(*tasks)
-        for html in all_htmls:
-            all_data.extend(parser.parse(html))
-        await self.download_images(all_data)
-        return all_data
-    
-    async def fetch_url(self, url: str) -> httpx.Response.content:
-        '''
-        Sends a GET request to the specified URL and returns the
-        body of the response in case the request is successful
-        and returns None otherwise
-        '''
-        response = await self.client.get(url)
-        if response.status_code == 200:
-            print(f'Fetched {url}')
-            return response.content
-        else:
-            print(f'Could not fetch {url}')
-            print(f'Status Code: {response.status_code}')
-            return None
-        
-    async def download_images(self, records: list[dict]) -> None:
-        '''
-        Scrapes the images for each player in the provided list of
-        records and then appends them in-place to each of the dictionary
-        '''
-        async def download_image(record: dict) -> None:
-            record['player_image'] = {
-                'data': await self.fetch_url(record['player_image_url']),
-                'filename': utils.get_image_filename(
-                    record['player_image_url'], record['player_name']
-                )
-            }
-            await asyncio.sleep(0.5)
-        
-        tasks = [download_image(record) for record in records]
-        await asyncio.gather(*tasks)
\ No newline at end of file
+import os
+import time
+import httpx
+import utils
+import asyncio
+import importlib.util
+from typing import AsyncIterator
+from urllib.parse import urlsplit
+from cache import ResponseCache
+from concurrent.futures import ProcessPoolExecutor
+from models import TransferRecord
+from schema import MISSING_VALUE
+from parser import parse_page, parse_first_page
+from logger import get_logger
+from metrics import metrics
+from images import ImageProcessor, Image
+from profiles import ProfileEnricher
+from config import (
+    HEADERS,
+    IMAGE_STORE_PATH,
+    SEASON_ID,
+    get_transfer_page_url,
+    get_images_path,
+    MAX_CONCURRENT_REQUESTS_PER_HOST,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    REQUESTS_PER_SECOND,
+    REQUESTS_BURST_SIZE,
+    PIPELINE_QUEUE_SIZE,
+    IMAGE_CHUNK_SIZE,
+    PARSER_WORKERS,
+    RETRY_STATUS_CODES,
+    MAX_RETRIES,
+    RETRY_BASE_DELAY_SECONDS,
+    RETRY_MAX_DELAY_SECONDS,
+    DEAD_LETTER_PATH,
+    MAX_CONNECTIONS,
+    MAX_KEEPALIVE_CONNECTIONS,
+    KEEPALIVE_EXPIRY_SECONDS,
+    USE_HTTP2,
+    FALLBACK_PAGE_COUNT,
+    PAGE_COUNTS_PATH,
+    PROCESS_IMAGES,
+    ENRICH_PROFILES,
+)
+
+logger = get_logger('scraper')
+
+class RetryableStatusError(Exception):
+    '''
+    Raised for responses whose status code means the request should
+    be tried again later, e.g. 429 or 503
+    '''
+    def __init__(self, status_code: int, retry_after: float=None) -> None:
+        super().__init__(f'Status Code: {status_code}')
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @classmethod
+    def check(cls, response: httpx.Response) -> None:
+        '''
+        Raises the error if the given response should be retried
+        '''
+        if response.status_code in RETRY_STATUS_CODES:
+            raise cls(
+                response.status_code,
+                utils.parse_retry_after(response.headers.get('Retry-After'))
+            )
+
+
+class TokenBucket:
+    '''
+    Limits the rate at which requests are sent. Tokens are refilled
+    continuously at the given rate and every request has to take
+    one token before it can be sent.
+    '''
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        '''
+        Waits until a token is available and takes it
+        '''
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.last_refill) * self.rate
+                )
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class RequestScheduler:
+    '''
+    Decides when a request can be sent. Every request must fit in
+    the concurrency limit of its host and in the global rate limit.
+    '''
+    def __init__(self) -> None:
+        self.host_semaphores = {}
+        self.bucket = TokenBucket(REQUESTS_PER_SECOND, REQUESTS_BURST_SIZE)
+
+    def get_host_semaphore(self, url: str) -> asyncio.Semaphore:
+        '''
+        Returns the semaphore limiting concurrent requests to the
+        host of the given URL, creating it on first use
+        '''
+        host = urlsplit(url).netloc
+        if host not in self.host_semaphores:
+            limit = MAX_CONCURRENT_REQUESTS_PER_HOST.get(
+                host, DEFAULT_MAX_CONCURRENT_REQUESTS
+            )
+            self.host_semaphores[host] = asyncio.Semaphore(limit)
+        return self.host_semaphores[host]
+
+    async def run(self, url: str, request: callable):
+        '''
+        Awaits the given request coroutine function once the
+        scheduler allows a request to the given URL
+        '''
+        async with self.get_host_semaphore(url):
+            await self.bucket.acquire()
+            return await request()
+
+
+class TransferScraper:
+    '''
+    Meant to handle communication with the server
+    '''
+    def __init__(self) -> None:
+        '''
+        Creates a session to be used throughout the program and
+        includes the headers from the config file. Listing pages and
+        images get separate clients so their connection pools are
+        tuned independently. Responses are cached on disk between
+        runs and pages are parsed in a pool of worker processes.
+        '''
+        self.clients = {
+            request_class: self.build_client(request_class)
+            for request_class in ('listing', 'image')
+        }
+        self.scheduler = RequestScheduler()
+        self.cache = ResponseCache()
+        self.image_downloads = {}
+        # Requests that failed for good, written to disk on close
+        self.dead_letters = []
+        # Number of pages of every season seen by the last run
+        self.page_counts = utils.read_json(PAGE_COUNTS_PATH, {})
+        self.parse_pool = ProcessPoolExecutor(max_workers=PARSER_WORKERS)
+        self.image_processor = None
+        if PROCESS_IMAGES:
+            if Image is None:
+                logger.warning('Pillow is not installed, skipping image processing')
+            else:
+                self.image_processor = ImageProcessor()
+        self.profile_enricher = ProfileEnricher(self) if ENRICH_PROFILES else None
+
+    def build_client(self, request_class: str) -> httpx.AsyncClient:
+        '''
+        Returns a client using the transport settings of the given
+        request class from the config file
+        '''
+        limits = httpx.Limits(
+            max_connections=MAX_CONNECTIONS[request_class],
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS[request_class],
+            keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+        )
+        http2 = USE_HTTP2 and importlib.util.find_spec('h2') is not None
+        headers = {
+            **HEADERS,
+            'Accept-Encoding': utils.get_accept_encoding(HEADERS['Accept-Encoding']),
+        }
+        logger.debug(
+            'Created client',
+            extra={
+                'request_class': request_class,
+                'http2': http2,
+                'max_connections': limits.max_connections,
+                'accept_encoding': headers['Accept-Encoding'],
+            }
+        )
+        return httpx.AsyncClient(
+            headers=headers, timeout=None, limits=limits, http2=http2
+        )
+
+    def get_client(self, url: str) -> httpx.AsyncClient:
+        request_class = utils.get_request_class(url)
+        # Profiles are on the listing host and share its connections
+        if request_class == 'profile':
+            request_class = 'listing'
+        return self.clients[request_class]
+
+    async def scrape(self, season_id: str=SEASON_ID) -> AsyncIterator[TransferRecord]:
+        '''
+        Yields records of the given season as soon as their page has
+        been parsed and their image has been downloaded. Pages are
+        handled in the order they finish instead of the order they
+        were requested. Several seasons can be scraped at once with
+        the same scraper so they share its session and limits.
+        '''
+        results = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        producer = asyncio.create_task(
+            self.produce_records(season_id, results)
+        )
+        try:
+            while True:
+                record = await results.get()
+                if record is None:
+                    break
+                # The producer puts its exception in the queue if it fails
+                if isinstance(record, Exception):
+                    raise record
+                yield record
+        finally:
+            producer.cancel()
+            # Waiting for the producer to stop the tasks it started
+            await asyncio.gather(producer, return_exceptions=True)
+
+    async def produce_records(self, season_id: str, results: asyncio.Queue) -> None:
+        '''
+        Fetches and parses all pages of the given season, downloads
+        the image of every parsed record and puts finished records in
+        the given queue. None is put in the queue once there are no
+        more records.
+
+        The page count is only known once the first page has been
+        parsed, so the other pages are requested at the same time
+        based on the page count of the previous run. Requests for pages
+        that turn out not to exist are cancelled, and their rows are
+        held back until the page count is known.
+        '''
+        page_url = get_transfer_page_url(season_id)
+        images_path = get_images_path(season_id)
+        first_page = None
+        image_tasks = []
+        page_tasks = {}
+        try:
+            guessed_page_count = self.page_counts.get(season_id, FALLBACK_PAGE_COUNT)
+            first_page = asyncio.create_task(self.fetch_first_page(page_url))
+            pending = {first_page}
+
+            def request_page(page: int) -> None:
+                page_tasks[page] = asyncio.create_task(
+                    self.fetch_and_parse(page_url + str(page))
+                )
+                pending.add(page_tasks[page])
+
+            def start_image_downloads(rows: list[tuple]) -> None:
+                for row in rows:
+                    record = TransferRecord(*row)
+                    image_tasks.append(asyncio.create_task(
+                        self.download_image(record, images_path, results)
+                    ))
+
+            for page in range(2, guessed_page_count + 1):
+                request_page(page)
+            page_count = None
+            # Rows of pages finished before the page count was known
+            held_back_pages = {}
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                pending -= done
+                if first_page in done:
+                    first_page_rows, page_count = first_page.result()
+                    if page_count is None:
+                        # Without a pagination list the guess is kept
+                        page_count = guessed_page_count
+                    else:
+                        self.page_counts[season_id] = page_count
+                    for page, page_task in page_tasks.items():
+                        if page > page_count:
+                            page_task.cancel()
+                            pending.discard(page_task)
+                    for page in range(guessed_page_count + 1, page_count + 1):
+                        request_page(page)
+                    start_image_downloads(first_page_rows)
+                for page, page_task in page_tasks.items():
+                    if page_task in done:
+                        held_back_pages[page] = page_task.result()
+                if page_count is not None:
+                    for page in list(held_back_pages):
+                        rows = held_back_pages.pop(page)
+                        if page <= page_count:
+                            start_image_downloads(rows)
+            await asyncio.gather(*image_tasks)
+        except Exception as error:
+            await results.put(error)
+        else:
+            await results.put(None)
+        finally:
+            # Pages and images still being fetched when the season fails
+            # or is cancelled are stopped before the clients are closed
+            tasks = [first_page, *page_tasks.values(), *image_tasks]
+            tasks = [task for task in tasks if task is not None and not task.done()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def fetch_first_page(self, page_url: str) -> tuple[list[tuple], int]:
+        '''
+        Fetches the first page of a season and returns its transfer
+        tuples along with the number of pages of the season, which is
+        None if it could not be determined
+        '''
+        html = await self.fetch_url(page_url + str(1))
+        if html is None:
+            return [], None
+        try:
+            with metrics.timer('listing', 'parse'):
+                return await self.run_in_parse_pool(parse_first_page, html)
+        except Exception as error:
+            self.add_dead_letter(page_url + str(1), str(error) or type(error).__name__)
+            return [], None
+
+    async def fetch_and_parse(self, url: str) -> list[tuple]:
+        '''
+        Fetches the page at the given URL and returns the transfer
+        tuples parsed from it by a worker process
+        '''
+        html = await self.fetch_url(url)
+        # The page is in the dead letters and has nothing to parse
+        if html is None:
+            return []
+        try:
+            # Includes the time the page waits for a free worker
+            with metrics.timer('listing', 'parse'):
+                return await self.run_in_parse_pool(parse_page, html)
+        except Exception as error:
+            self.add_dead_letter(url, str(error) or type(error).__name__)
+            return []
+
+    async def run_in_parse_pool(self, function: callable, *args):
+        '''
+        Runs the given parsing function in the process pool so the
+        event loop is not blocked while it runs
+        '''
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.parse_pool, function, *args)
+
+    async def fetch_url(self, url: str) -> httpx.Response.content:
+        '''
+        Sends a GET request to the specified URL and returns the
+        body of the response in case the request is successful
+        and returns None otherwise. Throttled requests and server
+        errors are retried as set in the config. Cached bodies are returned
+        without a request while they are fresh and are revalidated
+        with a conditional request once they go stale.
+        '''
+        request_class = utils.get_request_class(url)
+        entry = self.cache.get_entry(url)
+        if entry is not None and self.cache.is_fresh(entry, request_class):
+            logger.debug('Fetched from cache', extra={'url': url})
+            metrics.observe_cache_hit(request_class)
+            with metrics.timer(request_class, 'disk'):
+                return await self.cache.read(url)
+        headers = self.cache.get_validators(entry) if entry is not None else {}
+
+        async def get() -> httpx.Response:
+            # Timed once the scheduler lets the request through so
+            # waiting for a slot is not counted as latency
+            started = time.perf_counter()
+            response = await self.get_client(url).get(url, headers=headers)
+            metrics.observe_response(
+                request_class,
+                time.perf_counter() - started,
+                response.status_code,
+                len(response.content)
+            )
+            RetryableStatusError.check(response)
+            return response
+
+        response = await self.run_with_retries(url, get)
+        if response is None:
+            return None
+        if response.status_code == 304 and entry is not None:
+            logger.debug('Fetched from cache (not modified)', extra={'url': url})
+            self.cache.refresh(url, response.headers)
+            with metrics.timer(request_class, 'disk'):
+                return await self.cache.read(url)
+        elif response.status_code == 200:
+            logger.debug('Fetched', extra={'url': url})
+            with metrics.timer(request_class, 'disk'):
+                await self.cache.store(url, response.content, response.headers)
+            return response.content
+        else:
+            self.add_dead_letter(url, f'Status Code: {response.status_code}')
+            return None
+
+    async def run_with_retries(self, url: str, request: callable):
+        '''
+        Runs the given request coroutine function through the scheduler
+        and retries it while it fails with a retryable status or a
+        connection error. The scheduler's slot is given up while
+        waiting. Returns None once the request class's retry budget is
+        used up and adds the request to the dead letters.
+        '''
+        request_class = utils.get_request_class(url)
+        max_retries = MAX_RETRIES.get(request_class, 0)
+        for attempt in range(max_retries + 1):
+            try:
+                return await self.scheduler.run(url, request)
+            except (RetryableStatusError, httpx.TransportError) as error:
+                if attempt == max_retries:
+                    self.add_dead_letter(url, str(error) or type(error).__name__)
+                    return None
+                delay = utils.get_retry_delay(
+                    attempt,
+                    RETRY_BASE_DELAY_SECONDS,
+                    RETRY_MAX_DELAY_SECONDS,
+                    getattr(error, 'retry_after', None)
+                )
+                metrics.observe_retry(request_class)
+                logger.info('Retrying', extra={
+                    'url': url,
+                    'error': str(error) or type(error).__name__,
+                    'delay': round(delay, 2),
+                })
+                await asyncio.sleep(delay)
+
+    def add_dead_letter(self, url: str, reason: str) -> None:
+        '''
+        Records a request that failed for good so the run can go on
+        without it
+        '''
+        logger.warning(
+            'Could not fetch',
+            extra={'url': url, 'reason': reason}
+        )
+        metrics.observe_dead_letter(utils.get_request_class(url))
+        self.dead_letters.append({
+            'url': url,
+            'request_class': utils.get_request_class(url),
+            'reason': reason,
+        })
+
+    async def download_image(
+            self,
+            record: TransferRecord,
+            images_path: str,
+            results: asyncio.Queue
+    ) -> None:
+        '''
+        Adds the filename of the player's image to the given record once
+        it is in the images directory (see store_image) and puts the
+        record in the results queue. The player's profile is added to the record too
+        when profiles are enriched, and is fetched while the image is.
+        A record whose image or profile fails is kept without it and the
+        failure is added to the dead letters, so one record never stops
+        the run.
+        '''
+        profile = None
+        if self.profile_enricher is not None:
+            profile = self.profile_enricher.submit(record.player_page_url)
+        try:
+            record.player_image = await self.store_image(record, images_path)
+        except Exception as error:
+            self.add_dead_letter(record.player_image_url, str(error) or type(error).__name__)
+            record.player_image = None
+        if profile is not None:
+            # Shielded as the profile is shared with other records. A
+            # failed profile is None and already in the dead letters.
+            record.player_profile = await asyncio.shield(profile)
+        await results.put(record)
+
+    async def store_image(self, record: TransferRecord, images_path: str) -> str:
+        '''
+        Makes sure the image of the player in the given record is in
+        the shared image store and links it into the given images
+        directory. Returns the image's filename, or None if the row has
+        no image or it could not be downloaded.
+        '''
+        image_url = record.player_image_url
+        # Rows without an image have nothing to download
+        if image_url == MISSING_VALUE:
+            return None
+        filename = utils.get_image_filename(image_url, record.player_name)
+        store_path = os.path.join(
+            IMAGE_STORE_PATH, utils.get_image_store_filename(image_url)
+        )
+        # Players appearing in several records share one download
+        if store_path not in self.image_downloads:
+            self.image_downloads[store_path] = asyncio.create_task(
+                self.fetch_to_store(image_url, store_path)
+            )
+        # Shielded as the download is shared with other records, which
+        # may belong to seasons that are still running
+        if await asyncio.shield(self.image_downloads[store_path]):
+            if self.image_processor is not None:
+                self.image_processor.submit(store_path)
+            await asyncio.to_thread(
+                utils.link_or_copy,
+                store_path,
+                os.path.join(images_path, filename)
+            )
+            return filename
+        return None
+
+    async def fetch_to_store(self, url: str, store_path: str) -> bool:
+        '''
+        Downloads the image at the given URL to the shared image store
+        unless it is already there
+        '''
+        if await asyncio.to_thread(os.path.exists, store_path):
+            return True
+        return await self.fetch_to_file(url, store_path)
+
+    async def fetch_to_file(self, url: str, filepath: str) -> bool:
+        '''
+        Streams the body of the response for the given URL to a
+        temporary file chunk by chunk and renames it to the given path
+        once it is complete. File operations run in a worker thread
+        so the event loop keeps serving other requests. Cached bodies
+        are used in the same way as in fetch_url.
+        '''
+        request_class = utils.get_request_class(url)
+        entry = self.cache.get_entry(url)
+        if entry is not None and self.cache.is_fresh(entry, request_class):
+            metrics.observe_cache_hit(request_class)
+            with metrics.timer(request_class, 'disk'):
+                await self.cache.copy_to(url, filepath)
+            logger.debug('Fetched from cache', extra={'url': url})
+            return True
+        headers = self.cache.get_validators(entry) if entry is not None else {}
+
+        async def stream() -> bool:
+            started = time.perf_counter()
+            disk_seconds = 0.0
+            size = 0
+            async with self.get_client(url).stream('GET', url, headers=headers) as response:
+                if response.status_code != 200:
+                    metrics.observe_response(
+                        request_class,
+                        time.perf_counter() - started,
+                        response.status_code,
+                        0
+                    )
+                    RetryableStatusError.check(response)
+                if response.status_code == 304 and entry is not None:
+                    self.cache.refresh(url, response.headers)
+                    with metrics.timer(request_class, 'disk'):
+                        await self.cache.copy_to(url, filepath)
+                    logger.debug('Fetched from cache (not modified)', extra={'url': url})
+                    return True
+                if response.status_code != 200:
+                    self.add_dead_letter(url, f'Status Code: {response.status_code}')
+                    return False
+                file = await asyncio.to_thread(
+                    utils.create_temp_file, os.path.dirname(filepath)
+                )
+                try:
+                    async for chunk in response.aiter_bytes(IMAGE_CHUNK_SIZE):
+                        write_started = time.perf_counter()
+                        await asyncio.to_thread(file.write, chunk)
+                        size += len(chunk)
+                        disk_seconds += time.perf_counter() - write_started
+                    write_started = time.perf_counter()
+                    await asyncio.to_thread(file.close)
+                    await asyncio.to_thread(os.replace, file.name, filepath)
+                    disk_seconds += time.perf_counter() - write_started
+                except BaseException:
+                    await asyncio.to_thread(utils.discard_temp_file, file)
+                    raise
+                # Time spent writing chunks is counted as disk time
+                # instead of latency
+                metrics.observe_response(
+                    request_class,
+                    time.perf_counter() - started - disk_seconds,
+                    response.status_code,
+                    size
+                )
+                metrics.add_time(request_class, 'disk', disk_seconds)
+                with metrics.timer(request_class, 'disk'):
+                    await self.cache.store_file(url, filepath, response.headers)
+            logger.debug('Fetched', extra={'url': url})
+            return True
+
+        return bool(await self.run_with_retries(url, stream))
+
+    async def close(self) -> None:
+        '''
+        Closes the session, finishes processing images and fetching
+        profiles, saves the cache index and page counts for later runs,
+        writes the dead letters and stops the worker processes
+        '''
+        try:
+            if self.profile_enricher is not None:
+                await self.profile_enricher.close()
+            # Downloads left behind by seasons that were stopped
+            downloads = [task for task in self.image_downloads.values() if not task.done()]
+            for task in downloads:
+                task.cancel()
+            await asyncio.gather(*downloads, return_exceptions=True)
+            for client in self.clients.values():
+                await client.aclose()
+            if self.image_processor is not None:
+                await self.image_processor.close()
+        finally:
+            self.cache.close()
+            await asyncio.to_thread(utils.write_json, PAGE_COUNTS_PATH, self.page_counts)
+            if self.dead_letters:
+                await asyncio.to_thread(utils.write_json, DEAD_LETTER_PATH, self.dead_letters)
+                logger.warning(
+                    f'{len(self.dead_letters)} requests failed and have been '
+                    f'written to {DEAD_LETTER_PATH}'
+                )
+            elif os.path.exists(DEAD_LETTER_PATH):
+                # Left by an earlier run whose failures have been fetched now
+                os.remove(DEAD_LETTER_PATH)
+            self.parse_pool.shutdown()
@@ -1,51 +1,411 @@
-import os
-import pandas as pd
-from config import CSV_FILE_PATH, IMAGES_PATH
-
-class DataStorage:
-    def save(self, records: list[dict]) -> None:
-        if self.store_images(records, IMAGES_PATH):
-            print('Images have been written to disk')
-        else:
-            print('There was an error while writing images to disk')
-        if self.store_in_csv(records, CSV_FILE_PATH):
-            print('Data has been written to csv')
-        else:
-            print('There was an error while writing data to csv')
-    
-    def store_images(self, records: list[dict], dir_name: str) -> None:
-        '''
-        Stores images according to player names in the specified directory
-        name in the current path
-        '''
-        try:
-            dir_path = os.path.join(os.path.curdir, dir_name)
-            if not os.path.exists(dir_path):
-                os.makedirs(dir_path)
-            for record in records:
-                image_data = record['player_image']['data']
-                image_filename = record['player_image']['filename']
-                try:
-                    with open(os.path.join(dir_path, image_filename), 'wb') as file:
-                        file.write(image_data)
-                except:
-                    print(f'Error while writing to image file: {image_filename}')
-            return True
-        except:
-            return False
-        
-    def store_in_csv(self, records: list[dict], filepath: str) -> None:
-        '''
-        Stores the given records in a csv file
-        '''
-        try:
-            df = pd.DataFrame.from_dict(records)
-            # Dropping images as they have already been written on disk
-            df.drop(columns=['player_image'], inplace=True)
-            df.index = range(1, len(df) + 1)
-            df.index.name = 'transfer_id'
-
-            df.to_csv(filepath, index=True)
-            return True
-        except:
-            return False
\ No newline at end of file
+import os
+import json
+import uuid
+import asyncio
+import datetime
+import pandas as pd
+from config import (
+    CSV_FILE_PATH,
+    CSV_BATCH_SIZE,
+    NORMALIZE_RECORDS,
+    EXPORT_CSV,
+    WRITE_PARQUET,
+    DATASET_PATH,
+    PARQUET_COMPRESSION,
+    ENRICH_PROFILES,
+)
+from models import TransferRecord, RECORD_FIELDS, PROFILE_FIELDS, PROFILE_FIELD_TYPES
+from schema import MISSING_VALUE
+from logger import get_logger
+from metrics import metrics
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+logger = get_logger('storage')
+
+# Columns that identify a transfer across runs
+NATURAL_KEY = ['player_page_url', 'season', 'old_club_name', 'new_club_name']
+
+# Multipliers for the units used by Transfermarkt in amounts
+# such as €100.00m, €950k or €500Th.
+AMOUNT_UNITS = {'bn': 1_000_000_000, 'm': 1_000_000, 'k': 1_000, 'th.': 1_000}
+AMOUNT_REGEX = r'€\s*(?P<amount>[\d.,]+)\s*(?P<unit>bn|m|k|th\.)?'
+
+def parse_amounts(column: pd.Series) -> pd.Series:
+    '''
+    Converts a whole column of amounts such as €100.00m or
+    Loan fee:€2.00m to whole euros. Values without an amount
+    (e.g. '-', '?' or 'MISSING VALUE') become missing values.
+    '''
+    parts = column.astype('string').str.lower().str.extract(AMOUNT_REGEX)
+    amounts = pd.to_numeric(
+        parts['amount'].str.replace(',', '', regex=False), errors='coerce'
+    )
+    multipliers = parts['unit'].map(AMOUNT_UNITS).fillna(1)
+    return (amounts * multipliers).round().astype('Int64')
+
+def parse_season_start_years(column: pd.Series) -> pd.Series:
+    '''
+    Converts a whole column of seasons such as 17/18 or 78/79 to
+    the year in which they started. Two digit years later than next
+    year are taken to be in the 1900s.
+    '''
+    parts = column.astype('string').str.extract(r'^(?P<full>\d{4})|^(?P<short>\d{2})/')
+    full_years = pd.to_numeric(parts['full'], errors='coerce')
+    short_years = pd.to_numeric(parts['short'], errors='coerce')
+    century_cutoff = datetime.date.today().year % 100 + 1
+    short_years = short_years.where(
+        short_years > century_cutoff, short_years + 2000
+    ).where(short_years <= century_cutoff, short_years + 1900)
+    return full_years.fillna(short_years).astype('Int64')
+
+def to_nationality_list(value) -> list[str]:
+    '''
+    Converts the nationalities of a transfer to a list. The missing
+    value placeholder and any other value that is not a sequence of
+    nationalities becomes an empty list.
+    '''
+    if isinstance(value, (tuple, list)):
+        return list(value)
+    return []
+
+def normalize_records(df: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Converts the raw strings scraped from the page to typed columns
+    so that they do not have to be parsed again by every consumer.
+    Whole columns are converted at once instead of row by row.
+    '''
+    fees = df['transfer_fee_in_euros'].astype('string').str.lower()
+    df['is_loan'] = fees.str.contains('loan', regex=False).fillna(False).astype(bool)
+    df['is_free_transfer'] = fees.str.contains('free', regex=False).fillna(False).astype(bool)
+    df['transfer_fee_in_euros'] = parse_amounts(df['transfer_fee_in_euros']).mask(
+        df['is_free_transfer'], 0
+    )
+    df['player_value_in_euros'] = parse_amounts(df['player_value_in_euros'])
+    df['player_age'] = pd.to_numeric(df['player_age'], errors='coerce').astype('Int64')
+    df['season'] = parse_season_start_years(df['season'])
+    df['player_nationalities'] = df['player_nationalities'].map(to_nationality_list)
+    return df
+
+
+def get_transfer_ids(df: pd.DataFrame) -> pd.Series:
+    '''
+    Returns an ID for every transfer that stays the same between
+    runs. IDs are hashes of the transfer's natural key so they do not
+    depend on the order in which the transfers were scraped.
+    '''
+    hashes = pd.util.hash_pandas_object(
+        df[NATURAL_KEY].astype('string'), index=False
+    )
+    # Keeping IDs positive so they fit in a signed 64 bit column
+    return (hashes & 0x7FFFFFFFFFFFFFFF).astype('int64')
+
+def get_content_hashes(df: pd.DataFrame) -> pd.Series:
+    '''
+    Returns a hash of every transfer's values which is used to find
+    transfers that have changed since they were stored
+    '''
+    values = df.drop(columns=['transfer_id'], errors='ignore')
+    values = values[sorted(values.columns)]
+    # Lists are joined so they hash the same after being read back
+    values['player_nationalities'] = values['player_nationalities'].map('|'.join)
+    hashes = pd.util.hash_pandas_object(values.astype('string'), index=False)
+    return (hashes & 0x7FFFFFFFFFFFFFFF).astype('int64')
+
+def fix_column_types(table: 'pa.Table') -> 'pa.Table':
+    '''
+    Casts the columns whose Arrow type depends on the values of the
+    batch to a fixed type so every file of a partition has the same
+    schema. Text columns, and columns without any value, become string
+    columns and lists (the nationalities) become lists of strings.
+    '''
+    fields = []
+    for column in table.schema:
+        if pa.types.is_null(column.type) or pa.types.is_large_string(column.type):
+            column = column.with_type(pa.string())
+        elif pa.types.is_list(column.type) or pa.types.is_large_list(column.type):
+            column = column.with_type(pa.list_(pa.string()))
+        fields.append(column)
+    return table.cast(pa.schema(fields, metadata=table.schema.metadata))
+
+
+class ParquetDataset:
+    '''
+    A Parquet dataset partitioned by season (e.g. dataset/season=2017)
+    that is updated in place on every run. Transfers that are already
+    stored unchanged are skipped, new ones are appended to their
+    partition in a new file and a partition is only rewritten when one
+    of its transfers has changed.
+    '''
+    DEFAULT_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+    def __init__(
+            self,
+            dataset_path: str=DATASET_PATH,
+            compression: str=PARQUET_COMPRESSION
+    ) -> None:
+        self.dataset_path = dataset_path
+        self.compression = compression
+        self.touched_partitions = set()
+
+    def upsert(self, df: pd.DataFrame) -> int:
+        '''
+        Writes the new and changed transfers in the given normalized
+        data frame to their partitions and returns how many were written
+        '''
+        df = df.reset_index()
+        df = df.drop_duplicates(subset='transfer_id', keep='last')
+        df['content_hash'] = get_content_hashes(df)
+        rows_written = 0
+        for season, partition_df in df.groupby('season', dropna=False):
+            rows_written += self.upsert_partition(season, partition_df)
+        return rows_written
+
+    def get_partition_path(self, season) -> str:
+        if pd.isna(season):
+            return os.path.join(self.dataset_path, f'season={self.DEFAULT_PARTITION}')
+        return os.path.join(self.dataset_path, f'season={season}')
+
+    def upsert_partition(self, season, df: pd.DataFrame) -> int:
+        partition_path = self.get_partition_path(season)
+        self.touched_partitions.add(partition_path)
+        df = df.drop(columns=['season'])
+        if not os.path.exists(partition_path):
+            self.write_file(partition_path, df)
+            return len(df)
+
+        # Only the ID and hash columns are read to find what has changed
+        stored = self.read_partition(
+            partition_path, columns=['transfer_id', 'content_hash']
+        ).to_pandas()
+        stored_hashes = dict(zip(stored['transfer_id'], stored['content_hash']))
+        known = df['transfer_id'].isin(stored_hashes.keys())
+        changed = known & (
+            df['transfer_id'].map(stored_hashes) != df['content_hash']
+        )
+        new_df = df[~known]
+        if changed.any():
+            # Rewriting the partition without the old versions of the
+            # changed transfers
+            old_df = self.read_partition(partition_path).to_pandas()
+            old_df = old_df[~old_df['transfer_id'].isin(df.loc[changed, 'transfer_id'])]
+            merged = pd.concat([old_df, df[changed], new_df], ignore_index=True)
+            self.replace_partition(partition_path, merged)
+        elif len(new_df) > 0:
+            self.write_file(partition_path, new_df)
+        return int(changed.sum()) + len(new_df)
+
+    def compact(self) -> None:
+        '''
+        Merges the files that small batches have added to the
+        partitions touched by this run into one file per partition
+        '''
+        for partition_path in self.touched_partitions:
+            if len(self.get_partition_files(partition_path)) > 1:
+                self.replace_partition(
+                    partition_path, self.read_partition(partition_path).to_pandas()
+                )
+        self.touched_partitions = set()
+
+    def get_partition_files(self, partition_path: str) -> list[str]:
+        return sorted(
+            os.path.join(partition_path, filename)
+            for filename in os.listdir(partition_path)
+            if filename.endswith('.parquet')
+        )
+
+    def read_partition(self, partition_path: str, columns: list[str]=None) -> 'pa.Table':
+        '''
+        Returns the transfers of all files of a partition. Files are
+        read one by one and their schemas merged, as files written by
+        different batches or runs may lack some columns (e.g. profile
+        columns added later) or have columns without any value.
+        '''
+        tables = [
+            pq.read_table(path, columns=columns)
+            for path in self.get_partition_files(partition_path)
+        ]
+        # Permissive promotion also merges string and large_string
+        # columns of files written before column types were fixed
+        return pa.concat_tables(tables, promote_options='permissive')
+
+    def write_file(self, partition_path: str, df: pd.DataFrame) -> None:
+        '''
+        Adds a new file holding the given transfers to a partition
+        '''
+        os.makedirs(partition_path, exist_ok=True)
+        filename = f'part-{uuid.uuid4().hex}.parquet'
+        temp_path = os.path.join(partition_path, filename + '.part')
+        table = fix_column_types(pa.Table.from_pandas(df, preserve_index=False))
+        pq.write_table(table, temp_path, compression=self.compression)
+        os.replace(temp_path, os.path.join(partition_path, filename))
+
+    def replace_partition(self, partition_path: str, df: pd.DataFrame) -> None:
+        '''
+        Replaces all files of a partition with a single file holding
+        the given transfers
+        '''
+        old_files = self.get_partition_files(partition_path)
+        self.write_file(partition_path, df)
+        for old_file in old_files:
+            os.remove(old_file)
+
+
+class DataStorage:
+    '''
+    Writes records to disk incrementally as they are scraped. Records
+    are written in small batches to the Parquet dataset and, as an
+    optional export, appended to the season's csv file. Images have
+    already been streamed to disk by the scraper so records only carry
+    their filenames. Building the data frames and writing them run in
+    a worker thread so downloads go on while a batch is written.
+    '''
+    def __init__(self, csv_file_path: str=CSV_FILE_PATH) -> None:
+        self.csv_file_path = csv_file_path
+        self.pending_records = []
+        self.records_written = 0
+        self.dataset_rows_written = 0
+        self.missing_images = 0
+        self.csv_error = False
+        self.dataset_error = False
+        self.dataset = None
+        if WRITE_PARQUET:
+            if pa is None:
+                logger.warning('pyarrow is not installed, skipping the Parquet dataset')
+            else:
+                self.dataset = ParquetDataset()
+
+    async def save(self, record: TransferRecord) -> None:
+        '''
+        Queues the given record to be written with the next batch
+        '''
+        # Rows without an image URL have no image to write
+        if record.player_image is None and record.player_image_url != MISSING_VALUE:
+            self.missing_images += 1
+        self.pending_records.append(record)
+        if len(self.pending_records) >= CSV_BATCH_SIZE:
+            await self.flush()
+
+    async def flush(self) -> None:
+        '''
+        Writes all queued records to the dataset and the csv file
+        '''
+        if not self.pending_records:
+            return
+        records = self.pending_records
+        self.pending_records = []
+        with metrics.timer('records', 'transform'):
+            df, normalized_df = await asyncio.to_thread(self.build_frames, records)
+        if self.dataset is not None:
+            try:
+                with metrics.timer('records', 'disk'):
+                    self.dataset_rows_written += await asyncio.to_thread(
+                        self.dataset.upsert, normalized_df
+                    )
+            except Exception as error:
+                logger.error('Error while writing to the Parquet dataset', exc_info=error)
+                self.dataset_error = True
+        if EXPORT_CSV:
+            if NORMALIZE_RECORDS:
+                df = normalized_df
+            with metrics.timer('records', 'disk'):
+                if not await asyncio.to_thread(self.store_in_csv, df, self.csv_file_path):
+                    self.csv_error = True
+        self.records_written += len(records)
+        metrics.records_written += len(records)
+
+    async def close(self) -> None:
+        '''
+        Writes any remaining records and reports how the writes went
+        '''
+        await self.flush()
+        if self.dataset is not None and not self.dataset_error:
+            try:
+                with metrics.timer('records', 'disk'):
+                    await asyncio.to_thread(self.dataset.compact)
+            except Exception as error:
+                logger.error('Error while compacting the Parquet dataset', exc_info=error)
+                self.dataset_error = True
+        if self.missing_images == 0:
+            logger.info('Images have been written to disk')
+        else:
+            logger.error(
+                'There was an error while writing images to disk',
+                extra={'missing_images': self.missing_images}
+            )
+        if self.dataset is not None:
+            if not self.dataset_error:
+                logger.info(
+                    f'{self.dataset_rows_written} new or changed transfers have '
+                    f'been written to {self.dataset.dataset_path}'
+                )
+            else:
+                logger.error(f'There was an error while writing data to {self.dataset.dataset_path}')
+        if EXPORT_CSV:
+            if not self.csv_error:
+                logger.info(f'Data has been written to {self.csv_file_path}')
+            else:
+                logger.error(f'There was an error while writing data to {self.csv_file_path}')
+
+    def build_frames(self, records: list[TransferRecord]) -> tuple[pd.DataFrame, pd.DataFrame]:
+        '''
+        Returns the data frame of the given records as scraped and its
+        normalized copy
+        '''
+        df = self.build_frame(records)
+        normalized_df = normalize_records(df.copy())
+        if not NORMALIZE_RECORDS:
+            df['player_nationalities'] = df['player_nationalities'].map(to_nationality_list)
+        return df, normalized_df
+
+    def build_frame(self, records: list[TransferRecord]) -> pd.DataFrame:
+        '''
+        Returns a data frame of the given records indexed by their
+        stable transfer IDs
+        '''
+        df = pd.DataFrame.from_records(
+            [record.as_row() for record in records], columns=RECORD_FIELDS
+        )
+        # Dropping image filenames as they match the player names
+        df.drop(columns=['player_image', 'player_profile'], inplace=True)
+        if ENRICH_PROFILES:
+            self.add_profile_columns(df, records)
+        df.index = get_transfer_ids(df)
+        df.index.name = 'transfer_id'
+        return df
+
+    def add_profile_columns(self, df: pd.DataFrame, records: list[TransferRecord]) -> None:
+        '''
+        Joins the profiles of the players to their transfers. Columns
+        have the types of PROFILE_FIELD_TYPES so batches without any
+        profile are written to the dataset with the same schema as the
+        others.
+        '''
+        profiles = [record.player_profile or {} for record in records]
+        for name in PROFILE_FIELDS:
+            values = [profile.get(name) for profile in profiles]
+            if name == 'player_market_value_history':
+                values = [None if history is None else json.dumps(history) for history in values]
+            df[name] = pd.Series(values, index=df.index, dtype=PROFILE_FIELD_TYPES[name])
+
+    def store_in_csv(self, df: pd.DataFrame, filepath: str) -> bool:
+        '''
+        Appends the given records to a csv file. The file is created
+        again with a header row when the first batch is written.
+        '''
+        try:
+            first_batch = self.records_written == 0
+            if first_batch:
+                os.makedirs(os.path.dirname(filepath) or os.path.curdir, exist_ok=True)
+            df.to_csv(
+                filepath,
+                mode='w' if first_batch else 'a',
+                header=first_batch,
+                index=True
+            )
+            return True
+        except:
+            return False
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The scraper's modules import each other by name, as they do when the
+# scraper is run from its own directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
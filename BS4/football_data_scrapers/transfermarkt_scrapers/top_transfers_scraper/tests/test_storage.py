@@ -0,0 +1,114 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+import storage
+from storage import ParquetDataset
+from models import TransferRecord, PROFILE_FIELD_TYPES
+from schema import MISSING_VALUE
+
+'''
+Compaction of partitions whose files were written with different
+schemas, e.g. by batches without any profile or by runs made before
+profiles were enriched
+'''
+
+def write_raw_file(partition_path: str, filename: str, table: pa.Table) -> None:
+    # Written without ParquetDataset.write_file, like files of older runs
+    os.makedirs(partition_path, exist_ok=True)
+    pq.write_table(table, os.path.join(partition_path, filename))
+
+def read_compacted(partition_path: str) -> pd.DataFrame:
+    files = [name for name in os.listdir(partition_path) if name.endswith('.parquet')]
+    assert len(files) == 1
+    df = pq.read_table(os.path.join(partition_path, files[0])).to_pandas()
+    return df.sort_values('transfer_id').reset_index(drop=True)
+
+@pytest.mark.parametrize('null_file_first', [True, False])
+def test_compact_merges_null_and_string_columns(tmp_path, null_file_first):
+    dataset = ParquetDataset(str(tmp_path))
+    partition_path = dataset.get_partition_path(2017)
+    null_table = pa.table({
+        'transfer_id': pa.array([1], pa.int64()),
+        'player_foot': pa.nulls(1),
+    })
+    string_table = pa.table({
+        'transfer_id': pa.array([2], pa.int64()),
+        'player_foot': pa.array(['left'], pa.large_string()),
+    })
+    first, second = (null_table, string_table) if null_file_first else (string_table, null_table)
+    write_raw_file(partition_path, 'part-a.parquet', first)
+    write_raw_file(partition_path, 'part-b.parquet', second)
+    dataset.touched_partitions.add(partition_path)
+
+    dataset.compact()
+
+    df = read_compacted(partition_path)
+    assert df['transfer_id'].tolist() == [1, 2]
+    assert pd.isna(df.loc[0, 'player_foot'])
+    assert df.loc[1, 'player_foot'] == 'left'
+
+def test_compact_keeps_columns_missing_from_some_files(tmp_path):
+    dataset = ParquetDataset(str(tmp_path))
+    partition_path = dataset.get_partition_path(2017)
+    write_raw_file(partition_path, 'part-a.parquet', pa.table({
+        'transfer_id': pa.array([1], pa.int64()),
+        'player_name': pa.array(['A'], pa.string()),
+    }))
+    write_raw_file(partition_path, 'part-b.parquet', pa.table({
+        'transfer_id': pa.array([2], pa.int64()),
+        'player_name': pa.array(['B'], pa.string()),
+        'player_height_in_cm': pa.array([180], pa.int64()),
+    }))
+    dataset.touched_partitions.add(partition_path)
+
+    dataset.compact()
+
+    df = read_compacted(partition_path)
+    assert df['player_name'].tolist() == ['A', 'B']
+    assert pd.isna(df.loc[0, 'player_height_in_cm'])
+    assert df.loc[1, 'player_height_in_cm'] == 180
+
+def test_write_file_fixes_types_of_columns_without_values(tmp_path):
+    dataset = ParquetDataset(str(tmp_path))
+    partition_path = dataset.get_partition_path(2017)
+    dataset.write_file(partition_path, pd.DataFrame({
+        'transfer_id': [1],
+        'player_foot': pd.Series([None], dtype=object),
+        'player_nationalities': [[]],
+    }))
+
+    schema = pq.read_schema(os.path.join(partition_path, os.listdir(partition_path)[0]))
+    assert schema.field('player_foot').type == pa.string()
+    assert schema.field('player_nationalities').type == pa.list_(pa.string())
+
+def get_record(name: str, profile: dict=None) -> TransferRecord:
+    return TransferRecord(
+        name, f'/{name}/profil/spieler/1', MISSING_VALUE, 'Centre-Forward', '23',
+        '€1.00m', '17/18', ('England',), 'Club A', 'League A', 'Club B',
+        'League B', '€2.00m', player_profile=profile
+    )
+
+def test_batches_without_profiles_compact_with_enriched_ones(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, 'ENRICH_PROFILES', True)
+    data_storage = storage.DataStorage(str(tmp_path / 'players.csv'))
+    dataset = ParquetDataset(str(tmp_path / 'dataset'))
+    profile = {
+        'player_height_in_cm': 185,
+        'player_foot': 'right',
+        'player_market_value_history': [{'date': '2017-07-01', 'value_in_euros': 1000000}],
+    }
+
+    _, plain_df = data_storage.build_frames([get_record('a')])
+    _, enriched_df = data_storage.build_frames([get_record('b', profile)])
+    for name, dtype in PROFILE_FIELD_TYPES.items():
+        assert plain_df[name].dtype == dtype
+    dataset.upsert(plain_df)
+    dataset.upsert(enriched_df)
+    dataset.compact()
+
+    df = read_compacted(dataset.get_partition_path(2017)).sort_values('player_name')
+    assert pd.isna(df['player_foot'].iloc[0])
+    assert df['player_foot'].iloc[1] == 'right'
+    assert df['player_height_in_cm'].iloc[1] == 185
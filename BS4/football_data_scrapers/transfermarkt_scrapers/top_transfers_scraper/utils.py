@@ -1,17 +1,189 @@
-import re
-
-def get_image_filename(image_url: str, player_name: str) -> str:
-    '''
-    Returns the filename that should be used for the image.
-    Filename is determined by concatenating players name and
-    the file extension extracted with re from the given URL
-    '''
-    regex = re.compile(r'(\.[a-zA-Z]{3,4})(?=\?lm=1)')
-    match = regex.search(image_url)
-    if match:
-        file_extension = match[1].lower()
-        filename = player_name + file_extension
-        return filename
-    else:
-        print(f"There was an error while finding {player_name} image's filename")
-        return f'{player_name}_unknown_extension.jpg'
\ No newline at end of file
+import os
+import re
+import json
+import uuid
+import time
+import shutil
+import random
+import email.utils
+import importlib.util
+from urllib.parse import urlsplit
+from config import IMAGE_HOST
+from logger import get_logger
+
+logger = get_logger('utils')
+
+# Content encodings httpx can decode with the installed packages.
+# Brotli and Zstandard need optional packages, which are looked for
+# in the same way as h2 for HTTP/2.
+SUPPORTED_DECODERS = ['identity', 'gzip', 'deflate']
+if importlib.util.find_spec('brotli') or importlib.util.find_spec('brotlicffi'):
+    SUPPORTED_DECODERS.append('br')
+if importlib.util.find_spec('zstandard'):
+    SUPPORTED_DECODERS.append('zstd')
+
+# Finds the player ID in the path of a profile page URL such as
+# /kylian-mbappe/profil/spieler/342229
+PLAYER_ID_REGEX = re.compile(r'/profil/spieler/(\d+)')
+
+def get_image_filename(image_url: str, player_name: str) -> str:
+    '''
+    Returns the filename that should be used for the image.
+    Filename is determined by concatenating players name and
+    the file extension extracted with re from the given URL
+    '''
+    regex = re.compile(r'(\.[a-zA-Z]{3,4})(?=\?lm=1)')
+    match = regex.search(image_url)
+    if match:
+        file_extension = match[1].lower()
+        filename = player_name + file_extension
+        return filename
+    else:
+        logger.warning(
+            "There was an error while finding the image's filename",
+            extra={'player_name': player_name}
+        )
+        return f'{player_name}_unknown_extension.jpg'
+
+def get_image_store_filename(image_url: str) -> str:
+    '''
+    Returns the filename under which the image is kept in the shared
+    image store. Filename is determined by the player ID found in the
+    URL so that every player's image is only stored once. Images
+    without an ID (e.g. the default silhouette) are named after the
+    file in the URL.
+    '''
+    regex = re.compile(r'/(\d+)-\d+(\.[a-zA-Z]{3,4})(?=\?lm=1)')
+    match = regex.search(image_url)
+    if match:
+        return match[1] + match[2].lower()
+    return os.path.basename(urlsplit(image_url).path).lower()
+
+def create_temp_file(dir_path: str):
+    '''
+    Creates the given directory if needed and returns an open
+    binary file in it which is meant to be renamed once it has
+    been completely written
+    '''
+    os.makedirs(dir_path, exist_ok=True)
+    return open(os.path.join(dir_path, f'{uuid.uuid4().hex}.part'), 'xb')
+
+def discard_temp_file(file) -> None:
+    '''
+    Closes and removes a temporary file that could not be
+    completely written
+    '''
+    file.close()
+    try:
+        os.remove(file.name)
+    except OSError:
+        pass
+
+def link_or_copy(source_path: str, destination_path: str) -> None:
+    '''
+    Places the file at the source path at the destination path by
+    hardlinking it, or by copying it when linking is not possible.
+    The destination is replaced atomically if it already exists.
+    '''
+    dir_path = os.path.dirname(destination_path)
+    if dir_path:
+        os.makedirs(dir_path, exist_ok=True)
+    if os.path.exists(destination_path) and os.path.samefile(source_path, destination_path):
+        return
+    temp_path = f'{destination_path}.{uuid.uuid4().hex}.part'
+    try:
+        os.link(source_path, temp_path)
+    except OSError:
+        shutil.copyfile(source_path, temp_path)
+    os.replace(temp_path, destination_path)
+    # Renaming does nothing when both paths are links to the same file
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+def read_json(path: str, default_value):
+    '''
+    Returns the data of the given JSON file, or the default value if
+    the file does not exist or cannot be read
+    '''
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return default_value
+
+def write_json(path: str, data) -> None:
+    '''
+    Writes the given data as JSON to a temporary file and renames it
+    to the given path so the file is never left half written
+    '''
+    temp_path = f'{path}.{uuid.uuid4().hex}.part'
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, indent=2)
+    os.replace(temp_path, path)
+
+def get_accept_encoding(advertised: str) -> str:
+    '''
+    Returns the given Accept-Encoding value without the encodings that
+    cannot be decoded, so the server never sends a body that would be
+    read as garbage
+    '''
+    encodings = [
+        encoding.strip() for encoding in advertised.split(',')
+        if encoding.split(';')[0].strip() in SUPPORTED_DECODERS
+    ]
+    return ', '.join(encodings) or 'identity'
+
+def get_request_class(url: str) -> str:
+    '''
+    Returns the class of the request for the given URL which is
+    used to pick caching and scheduling policies
+    '''
+    parts = urlsplit(url)
+    if parts.netloc == IMAGE_HOST:
+        return 'image'
+    if PLAYER_ID_REGEX.search(parts.path) or parts.path.startswith('/ceapi/'):
+        return 'profile'
+    return 'listing'
+
+def get_player_id(player_page_url: str) -> str:
+    '''
+    Returns the Transfermarkt ID of the player found in the URL of
+    their profile page, or None if there is none
+    '''
+    match = PLAYER_ID_REGEX.search(urlsplit(player_page_url).path)
+    return match[1] if match else None
+
+def parse_retry_after(value: str) -> float:
+    '''
+    Returns the number of seconds to wait given by a Retry-After
+    header, which holds either a number of seconds or an HTTP date.
+    Returns None if the header is missing or cannot be read.
+    '''
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_date.timestamp() - time.time())
+
+def get_retry_delay(
+        attempt: int,
+        base_delay: float,
+        max_delay: float,
+        retry_after: float=None
+) -> float:
+    '''
+    Returns the number of seconds to wait before the given retry
+    (starting at 0). The delay is drawn at random up to the capped
+    exponential backoff so retries of many requests spread out, and
+    is never shorter than the Retry-After time asked for by the server.
+    '''
+    delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
@@ -1,20 +1,39 @@
-import requests
-from bs4 import BeautifulSoup
-
-'''
-This script is meant for practicing spoofing headers. The target
-page does not return the required content unless the correct headers
-are provided with the request.
-'''
-
-URL = 'https://www.scrapethissite.com/pages/advanced/?gotcha=headers'
-headers = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:129.0) Gecko/20100101 Firefox/129.0',
-    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/png,image/svg+xml,*/*;q=0.8'
-}
-
-response = requests.get(URL, headers=headers)
-soup = BeautifulSoup(response.content, 'html.parser')
-
-message = soup.find('div', 'col-md-4 col-md-offset-4')
-print(message.get_text().strip())
\ No newline at end of file
+import requests
+from bs4 import BeautifulSoup
+from site_runner import SiteSpec
+
+'''
+This script is meant for practicing spoofing headers. The target
+page does not return the required content unless the correct headers
+are provided with the request.
+'''
+
+URL = 'https://www.scrapethissite.com/pages/advanced/?gotcha=headers'
+headers = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:129.0) Gecko/20100101 Firefox/129.0',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/png,image/svg+xml,*/*;q=0.8'
+}
+
+def get_message(soup: BeautifulSoup, url: str=None) -> list[str]:
+    message = soup.find('div', 'col-md-4 col-md-offset-4')
+    return [message.get_text().strip()]
+
+def print_messages(messages: list[str], runner=None) -> None:
+    for message in messages:
+        print(message)
+
+
+# Used by site_runner.py to check the headers along with other sites
+SPEC = SiteSpec(
+    name='advanced_headers',
+    seed_urls=[URL],
+    headers=headers,
+    extract_rows=get_message,
+    sink=print_messages,
+)
+
+if __name__ == '__main__':
+    response = requests.get(URL, headers=headers)
+    soup = BeautifulSoup(response.content, 'html.parser')
+
+    print_messages(get_message(soup))
\ No newline at end of file
@@ -1,42 +1,67 @@
-from bs4 import BeautifulSoup, Tag
-import requests
-import pandas as pd
-
-def get_country_info(tag_name: str, attributes: dict) -> str:
-    info = (
-        div.find(tag_name, attributes)
-        .get_text()
-        .strip()
-    )
-    return info
-
-
-TARGET_URL = 'https://www.scrapethissite.com/pages/simple/'
-
-html = requests.get(TARGET_URL)
-soup = BeautifulSoup(html.content, 'html.parser')
-
-country_divs = soup.findAll('div', {'class': 'col-md-4 country'})
-
-country_infos = []
-
-for div in country_divs:
-    country_name = get_country_info('h3', {'class': 'country-name'})
-    country_area_km2 = get_country_info('span', {'class': 'country-area'})
-    country_capital = get_country_info('span', {'class': 'country-capital'})
-    country_population = get_country_info('span', {'class': 'country-population'})
-    country_data = {
-        'country_name': country_name,
-        'country_capital': country_capital,
-        'country_area_km2': country_area_km2,
-        'country_population': country_population
-    }
-    country_infos.append(country_data)
-
-df = pd.DataFrame.from_dict(country_infos)
-
-try:
-    df.to_excel('countries.xlsx', sheet_name='countries')
-    print('Values have been written to excel file')
-except FileNotFoundError:
-    print('Excel file does not exist')
\ No newline at end of file
+import os
+import asyncio
+from bs4 import BeautifulSoup, Tag
+import requests
+import pandas as pd
+from site_runner import SiteSpec
+
+def get_country_info(div: Tag, tag_name: str, attributes: dict) -> str:
+    info = (
+        div.find(tag_name, attributes)
+        .get_text()
+        .strip()
+    )
+    return info
+
+def get_country_infos(soup: BeautifulSoup, url: str=None) -> list[dict]:
+    '''
+    Returns the records of all countries listed on the page
+    '''
+    country_divs = soup.findAll('div', {'class': 'col-md-4 country'})
+
+    country_infos = []
+
+    for div in country_divs:
+        country_name = get_country_info(div, 'h3', {'class': 'country-name'})
+        country_area_km2 = get_country_info(div, 'span', {'class': 'country-area'})
+        country_capital = get_country_info(div, 'span', {'class': 'country-capital'})
+        country_population = get_country_info(div, 'span', {'class': 'country-population'})
+        country_data = {
+            'country_name': country_name,
+            'country_capital': country_capital,
+            'country_area_km2': country_area_km2,
+            'country_population': country_population
+        }
+        country_infos.append(country_data)
+    return country_infos
+
+def store_countries(country_infos: list[dict], filepath: str) -> None:
+    df = pd.DataFrame.from_dict(country_infos)
+
+    try:
+        df.to_excel(filepath, sheet_name='countries')
+        print('Values have been written to excel file')
+    except FileNotFoundError:
+        print('Excel file does not exist')
+
+
+TARGET_URL = 'https://www.scrapethissite.com/pages/simple/'
+# Where the site runner writes the countries, next to this script
+COUNTRIES_XLSX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'countries.xlsx')
+
+# Used by site_runner.py to scrape the countries along with other sites
+SPEC = SiteSpec(
+    name='countries',
+    seed_urls=[TARGET_URL],
+    extract_rows=get_country_infos,
+    # Written in a thread so the other sites are not blocked meanwhile
+    sink=lambda country_infos, runner: asyncio.to_thread(
+        store_countries, country_infos, COUNTRIES_XLSX_PATH
+    ),
+)
+
+if __name__ == '__main__':
+    html = requests.get(TARGET_URL)
+    soup = BeautifulSoup(html.content, 'html.parser')
+
+    store_countries(get_country_infos(soup), 'countries.xlsx')
\ No newline at end of file
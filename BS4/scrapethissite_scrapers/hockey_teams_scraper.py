@@ -1,103 +1,231 @@
-import time
-import requests
-import pandas as pd
-from bs4 import BeautifulSoup
-
-def check_page_validity(soup_object: BeautifulSoup) -> bool:
-    '''
-    Checks to see if the given page has any team entries in the
-    table. No entries in the table other than the header row means
-    that the page is invalid.
-    '''
-    data_table = soup_object.find('table', {'class': 'table'})
-    if data_table.find('tr', {'class': 'team'}):
-        return True
-    else:
-        return False
-    
-
-def get_all_page_soups(base_url: str) -> list:
-    '''
-    Returns BeautifulSoup objects for all pages by iterating through
-    page numbers until the program reaches the last page
-    '''
-    page_number = 1
-    soup_objects = []
-    while True:
-        response = requests.get(base_url, params={'page_num': page_number})
-        html = response.content
-        soup = BeautifulSoup(html, 'html.parser')
-        if check_page_validity(soup):
-            soup_objects.append(soup)
-        else:
-            break
-        page_number += 1
-    return soup_objects
-
-def get_specific_info(tag_object, tag_name, *possible_tag_classes) -> str:
-    '''
-    Returns a single piece of required info after parsing a single
-    team record. Checks multiple class names in case of a possibilty
-    of different class names for the same tag in the page.
-    '''
-    for tag_class in possible_tag_classes:
-        info = tag_object.find(tag_name, {'class': tag_class})
-        if info:
-            return info.get_text().strip()
-
-def get_team_info(tag_object) -> dict:
-    '''
-    Returns a dictionary representing one complete record in the page
-    table.
-    '''
-    team_name = get_specific_info(tag_object, 'td', 'name')
-    year = get_specific_info(tag_object, 'td', 'year')
-    wins = get_specific_info(tag_object, 'td', 'wins')
-    losses = get_specific_info(tag_object, 'td', 'losses')
-    ot_losses = get_specific_info(tag_object, 'td', 'ot-losses')
-    win_percentage = get_specific_info(
-        tag_object, 'td', 'pct text-success', 'pct text-danger'
-    )
-    goals_for = get_specific_info(tag_object, 'td', 'gf')
-    goals_against = get_specific_info(tag_object, 'td', 'ga')
-    goal_difference = get_specific_info(
-        tag_object, 'td', 'diff text-success', 'diff text-danger'
-    )
-    data = {
-        'team_name': team_name,
-        'year': year,
-        'wins': wins,
-        'losses': losses,
-        'ot_losses': ot_losses,
-        'win_percentage': win_percentage,
-        'goals_for': goals_for,
-        'goals_against': goals_against,
-        'goal_difference': goal_difference,
-    }
-    return data
-
-# Used to measure the time taken by the program to execute
-start_time = time.time()
-
-BASE_URL = 'https://www.scrapethissite.com/pages/forms/'
-
-team_infos = []
-teams_collected = 0
-
-soups = get_all_page_soups(BASE_URL)
-
-for soup in soups:
-    data_table = soup.find('table', {'class': 'table'})
-    teams = data_table.find_all('tr', {'class': 'team'})
-    for team in teams:
-        team_info = get_team_info(team)
-        team_infos.append(team_info)
-        teams_collected += 1
-        print(teams_collected)
-
-df = pd.DataFrame.from_dict(team_infos)
-df.index = range(1, len(df) + 1)
-df.index.name = 'record_id'
-df.to_csv('teams.csv', index=True)
-
-print(f'--- {time.time() - start_time} seconds ---')
\ No newline at end of file
+import os
+import time
+import asyncio
+import requests
+import pandas as pd
+from functools import partial
+from urllib.parse import urlsplit, parse_qs, urlencode
+from concurrent.futures import ThreadPoolExecutor
+from site_runner import SiteSpec, Fallback
+from table_extractor import Column, get_table_extractor
+from page_discovery import (
+    PAGE_SIZES,
+    check_row_counts,
+    get_widget_page_count,
+    get_probes_per_round,
+    find_last_page,
+    find_last_page_async,
+)
+
+BASE_URL = 'https://www.scrapethissite.com/pages/forms/'
+# Where the site runner writes the teams, next to this script
+TEAMS_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'teams.csv')
+# Columns of the teams table, the percentage and difference cells also
+# have a text-success or text-danger class
+TEAM_COLUMNS = (
+    Column('team_name', 'name'),
+    Column('year', 'year'),
+    Column('wins', 'wins'),
+    Column('losses', 'losses'),
+    Column('ot_losses', 'ot-losses'),
+    Column('win_percentage', 'pct'),
+    Column('goals_for', 'gf'),
+    Column('goals_against', 'ga'),
+    Column('goal_difference', 'diff'),
+)
+TEAMS_TABLE = get_table_extractor(TEAM_COLUMNS, {'class': 'table'}, row_class='team')
+
+def check_page_validity(document) -> bool:
+    '''
+    Checks to see if the given page has any team entries in the
+    table. No entries in the table other than the header row means
+    that the page is invalid.
+    '''
+    if TEAMS_TABLE.find_rows(document):
+        return True
+    else:
+        return False
+
+def count_teams(document) -> int:
+    return len(TEAMS_TABLE.find_rows(document))
+    
+
+def get_page_document(base_url: str, page_number: int, per_page: int=None):
+    # requests leaves out parameters set to None
+    response = requests.get(
+        base_url, params={'page_num': page_number, 'per_page': per_page}
+    )
+    return TEAMS_TABLE.load(response.content)
+
+def get_all_page_documents(base_url: str) -> list:
+    '''
+    Returns the parsed documents of all pages. Pages are requested
+    with the largest page size of PAGE_SIZES so the table comes in a
+    few large pages. The next smaller size is used if the first page
+    has no teams with that size, or if the numbers of teams on the
+    pages show that the server did not keep to a single page size.
+    '''
+    for per_page in PAGE_SIZES:
+        documents = get_sized_page_documents(base_url, per_page)
+        if check_row_counts([count_teams(document) for document in documents]):
+            return documents
+        print(f'Could not get the teams in pages of {per_page} teams')
+    return documents
+
+def get_sized_page_documents(base_url: str, per_page: int=None) -> list:
+    '''
+    Returns the parsed documents of all pages of the given size. The
+    last page is read from the pagination widget of the first page, or
+    searched for with a few rounds of probes when there is no widget
+    (see page_discovery.py). Probes and the remaining pages are fetched
+    by four threads, and pages fetched as probes are not fetched again.
+    '''
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        fetch_pages = partial(
+            executor.map, partial(get_page_document, base_url, per_page=per_page)
+        )
+        # Valid pages fetched so far keyed by their page number
+        documents = {1: get_page_document(base_url, 1, per_page)}
+        if not check_page_validity(documents[1]):
+            return []
+
+        def probe_pages(page_numbers: list[int]) -> list[list[tuple]]:
+            page_rows = []
+            for page_number, document in zip(page_numbers, fetch_pages(page_numbers)):
+                rows = get_page_teams(document)
+                if rows:
+                    documents[page_number] = document
+                page_rows.append(rows)
+            return page_rows
+
+        widget_page_count = get_widget_page_count(
+            TEAMS_TABLE.get_link_texts(documents[1], 'pagination')
+        )
+        last_page = find_last_page(
+            probe_pages,
+            widget_page_count or 1,
+            get_probes_per_round(widget_page_count)
+        )
+        missing_pages = [
+            page_number for page_number in range(2, last_page + 1)
+            if page_number not in documents
+        ]
+        documents.update(zip(missing_pages, fetch_pages(missing_pages)))
+    return [documents[page_number] for page_number in range(1, last_page + 1)]
+
+def get_page_teams(document, url: str=None) -> list[tuple]:
+    '''
+    Returns the records of all teams in the table of the given page,
+    each a tuple of the values named in TEAM_COLUMNS
+    '''
+    return TEAMS_TABLE.extract_rows(document)
+
+def get_page_url(page_number: int, per_page: int=None) -> str:
+    params = {'page_num': page_number}
+    if per_page is not None:
+        params['per_page'] = per_page
+    return f'{BASE_URL}?{urlencode(params)}'
+
+async def get_other_page_urls(document, url: str, runner) -> list:
+    '''
+    Pagination rule of the site spec. The first page leads to all the
+    other pages of the same size once the last page has been found in
+    the same way as in get_sized_page_documents, with the probes sent
+    through the runner. The other pages are fetched here so that the
+    numbers of teams on the pages can be checked, and are handed on
+    with their documents so the runner does not fetch them again. A
+    first page without teams, or pages that do not keep to a single
+    page size, are replaced with the first page of the next smaller
+    size in PAGE_SIZES.
+    '''
+    params = parse_qs(urlsplit(url).query)
+    if params['page_num'] != ['1']:
+        return []
+    per_page = int(params['per_page'][0]) if 'per_page' in params else None
+    if per_page is None:
+        # The default size is the last one to try
+        fallback = []
+    else:
+        fallback = Fallback([get_page_url(1, PAGE_SIZES[PAGE_SIZES.index(per_page) + 1])])
+    if not check_page_validity(document):
+        return fallback
+
+    # Pages fetched so far keyed by their page number
+    documents = {1: document}
+
+    async def fetch_pages(page_numbers: list[int]) -> list:
+        bodies = await asyncio.gather(*[
+            runner.fetch(get_page_url(page_number, per_page))
+            for page_number in page_numbers
+        ])
+        for page_number, body in zip(page_numbers, bodies):
+            if body is not None:
+                documents[page_number] = TEAMS_TABLE.load(body)
+        return [documents.get(page_number) for page_number in page_numbers]
+
+    async def probe_pages(page_numbers: list[int]) -> list[list[tuple]]:
+        return [
+            [] if document is None else get_page_teams(document)
+            for document in await fetch_pages(page_numbers)
+        ]
+
+    widget_page_count = get_widget_page_count(
+        TEAMS_TABLE.get_link_texts(document, 'pagination')
+    )
+    last_page = await find_last_page_async(
+        probe_pages,
+        widget_page_count or 1,
+        get_probes_per_round(widget_page_count)
+    )
+    await fetch_pages([
+        page_number for page_number in range(2, last_page + 1)
+        if page_number not in documents
+    ])
+    row_counts = [
+        count_teams(documents[page_number]) if page_number in documents else 0
+        for page_number in range(1, last_page + 1)
+    ]
+    if not check_row_counts(row_counts) and per_page is not None:
+        print(f'Could not get the teams in pages of {per_page} teams')
+        return fallback
+    return [
+        (get_page_url(page_number, per_page), documents.get(page_number))
+        for page_number in range(2, last_page + 1)
+    ]
+
+def store_teams(team_infos: list[tuple], filepath: str) -> None:
+    df = pd.DataFrame.from_records(team_infos, columns=TEAMS_TABLE.fields)
+    df.index = range(1, len(df) + 1)
+    df.index.name = 'record_id'
+    df.to_csv(filepath, index=True)
+
+
+# Used by site_runner.py to scrape the teams along with other sites
+SPEC = SiteSpec(
+    name='hockey_teams',
+    seed_urls=[get_page_url(1, PAGE_SIZES[0])],
+    load=TEAMS_TABLE.load,
+    extract_rows=get_page_teams,
+    paginate=get_other_page_urls,
+    # Written in a thread so the other sites are not blocked meanwhile
+    sink=lambda team_infos, runner: asyncio.to_thread(store_teams, team_infos, TEAMS_CSV_PATH),
+)
+
+if __name__ == '__main__':
+    # Used to measure the time taken by the program to execute
+    start_time = time.time()
+
+    team_infos = []
+    teams_collected = 0
+
+    documents = get_all_page_documents(BASE_URL)
+
+    for document in documents:
+        for team_info in get_page_teams(document):
+            team_infos.append(team_info)
+            teams_collected += 1
+            print(teams_collected)
+
+    store_teams(team_infos, 'teams.csv')
+
+    print(f'--- {time.time() - start_time} seconds ---')
\ No newline at end of file
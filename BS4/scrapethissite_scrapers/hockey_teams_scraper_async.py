@@ -1,121 +1,142 @@
-import time
-import requests
-import pandas as pd
-import concurrent.futures
-from bs4 import BeautifulSoup
-from concurrent.futures import ThreadPoolExecutor
-
-'''
-Asynchronous implementation of the hockey teams scraper.
-Uses four workers to scrape multiple pages at once.
-
-Synchronous execution time: 66.34s
-Asynchronous execution time: 14.55s
-'''
-
-def check_page_validity(soup_object: BeautifulSoup) -> bool:
-    '''
-    Checks to see if the given page has any team entries in the
-    table. No entries in the table other than the header row means
-    that the page is invalid.
-    '''
-    data_table = soup_object.find('table', {'class': 'table'})
-    if data_table.find('tr', {'class': 'team'}):
-        return True
-    else:
-        return False
-    
-
-def get_all_urls(base_url: str, max_page_number: int) -> list:
-    '''
-    Returns BeautifulSoup objects for all pages by iterating through
-    page numbers until the program reaches the last page
-    '''
-    urls = [f'{base_url}?page_num={num}' for num in range(1, max_page_number + 1)]
-    return urls
-
-def get_page_soup(url: str) -> BeautifulSoup:
-    response = requests.get(url)
-    html = response.content
-    soup = BeautifulSoup(html, 'html.parser')
-    return soup
-
-def get_all_page_soups(urls: list[str]) -> list[BeautifulSoup]:
-    with ThreadPoolExecutor(max_workers=4) as executor:
-        future_results = {
-            executor.submit(get_page_soup, url): url for url in urls
-        }
-        soups = []
-        for future in concurrent.futures.as_completed(future_results):
-            soups.append(future.result())
-        return soups
-
-def get_specific_info(tag_object, tag_name, *possible_tag_classes) -> str:
-    '''
-    Returns a single piece of required info after parsing a single
-    team record. Checks multiple class names in case of a possibilty
-    of different class names for the same tag in the page.
-    '''
-    for tag_class in possible_tag_classes:
-        info = tag_object.find(tag_name, {'class': tag_class})
-        if info:
-            return info.get_text().strip()
-
-def get_team_info(tag_object) -> dict:
-    '''
-    Returns a dictionary representing one complete record in the page
-    table.
-    '''
-    team_name = get_specific_info(tag_object, 'td', 'name')
-    year = get_specific_info(tag_object, 'td', 'year')
-    wins = get_specific_info(tag_object, 'td', 'wins')
-    losses = get_specific_info(tag_object, 'td', 'losses')
-    ot_losses = get_specific_info(tag_object, 'td', 'ot-losses')
-    win_percentage = get_specific_info(
-        tag_object, 'td', 'pct text-success', 'pct text-danger'
-    )
-    goals_for = get_specific_info(tag_object, 'td', 'gf')
-    goals_against = get_specific_info(tag_object, 'td', 'ga')
-    goal_difference = get_specific_info(
-        tag_object, 'td', 'diff text-success', 'diff text-danger'
-    )
-    data = {
-        'team_name': team_name,
-        'year': year,
-        'wins': wins,
-        'losses': losses,
-        'ot_losses': ot_losses,
-        'win_percentage': win_percentage,
-        'goals_for': goals_for,
-        'goals_against': goals_against,
-        'goal_difference': goal_difference,
-    }
-    return data
-
-# Used to measure the time taken by the program to execute
-start_time = time.time()
-
-BASE_URL = 'https://www.scrapethissite.com/pages/forms/'
-MAX_PAGE_NUMBER = 24
-urls = get_all_urls(BASE_URL, MAX_PAGE_NUMBER)
-
-team_infos = []
-teams_collected = 0
-
-soups = get_all_page_soups(urls)
-
-for soup in soups:
-    data_table = soup.find('table', {'class': 'table'})
-    teams = data_table.find_all('tr', {'class': 'team'})
-    for team in teams:
-        team_info = get_team_info(team)
-        team_infos.append(team_info)
-        teams_collected += 1
-        print(teams_collected)
-
-df = pd.DataFrame.from_dict(team_infos)
-df.index = range(1, len(df) + 1)
-df.index.name = 'record_id'
-df.to_csv('teams.csv', index=True)
-
+import time
+import requests
+import pandas as pd
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
+from reorder_buffer import map_in_order
+from hockey_teams_scraper import TEAMS_TABLE
+from page_discovery import (
+    PAGE_SIZES,
+    check_row_counts,
+    get_widget_page_count,
+    get_probes_per_round,
+    find_last_page,
+)
+
+'''
+Asynchronous implementation of the hockey teams scraper.
+Uses four workers to scrape multiple pages at once.
+
+Synchronous execution time: 66.34s
+Asynchronous execution time: 14.55s
+'''
+
+def check_page_validity(document) -> bool:
+    '''
+    Checks to see if the given page has any team entries in the
+    table. No entries in the table other than the header row means
+    that the page is invalid.
+    '''
+    if TEAMS_TABLE.find_rows(document):
+        return True
+    else:
+        return False
+    
+
+def get_page_url(base_url: str, page_number: int, per_page: int=None) -> str:
+    params = {'page_num': page_number}
+    if per_page is not None:
+        params['per_page'] = per_page
+    return f'{base_url}?{urlencode(params)}'
+
+def get_all_urls(base_url: str, max_page_number: int, per_page: int=None) -> list:
+    '''
+    Returns the URLs of all pages of the given size up to the given
+    page number
+    '''
+    urls = [
+        get_page_url(base_url, num, per_page)
+        for num in range(1, max_page_number + 1)
+    ]
+    return urls
+
+def get_page_document(url: str):
+    response = requests.get(url)
+    return TEAMS_TABLE.load(response.content)
+
+def get_last_page_number(documents: dict, base_url: str, per_page: int=None) -> int:
+    '''
+    Returns the number of the last page of the table with the given
+    page size. It is read from the pagination widget of the first page,
+    or searched for with a few rounds of probes sent by four threads
+    when there is no widget (see page_discovery.py). documents holds
+    the pages fetched so far keyed by their page number, starting with
+    the first page, and the pages with teams fetched as probes are
+    added to it.
+    '''
+    if not check_page_validity(documents[1]):
+        return 0
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        def probe_pages(page_numbers: list[int]) -> list[list[tuple]]:
+            urls = [get_page_url(base_url, num, per_page) for num in page_numbers]
+            page_rows = []
+            for page_number, document in zip(page_numbers, executor.map(get_page_document, urls)):
+                rows = TEAMS_TABLE.extract_rows(document)
+                if rows:
+                    documents[page_number] = document
+                page_rows.append(rows)
+            return page_rows
+
+        widget_page_count = get_widget_page_count(
+            TEAMS_TABLE.get_link_texts(documents[1], 'pagination')
+        )
+        return find_last_page(
+            probe_pages,
+            widget_page_count or 1,
+            get_probes_per_round(widget_page_count)
+        )
+
+def get_all_page_documents(documents: dict, urls: list[str]):
+    '''
+    Yields the parsed documents of the given pages in page order, so
+    the teams get the same record IDs on every run. Pages already in
+    documents (the first page and the probes) are not fetched again.
+    '''
+    page_numbers = range(1, len(urls) + 1)
+    missing_urls = [
+        url for page_number, url in zip(page_numbers, urls)
+        if page_number not in documents
+    ]
+    fetched_documents = map_in_order(get_page_document, missing_urls, max_workers=4)
+    for page_number in page_numbers:
+        if page_number in documents:
+            yield documents.pop(page_number)
+        else:
+            yield next(fetched_documents)
+
+# Used to measure the time taken by the program to execute
+start_time = time.time()
+
+BASE_URL = 'https://www.scrapethissite.com/pages/forms/'
+# Pages are requested with the largest page size of PAGE_SIZES and
+# with the next smaller one if the first page has no teams with that
+# size, or if the numbers of teams on the pages show that the server
+# did not keep to a single page size
+for per_page in PAGE_SIZES:
+    # Pages fetched while looking for the last page keyed by their number
+    documents = {1: get_page_document(get_page_url(BASE_URL, 1, per_page))}
+    last_page_number = get_last_page_number(documents, BASE_URL, per_page)
+    urls = get_all_urls(BASE_URL, last_page_number, per_page)
+    team_infos = []
+    row_counts = []
+    teams_collected = 0
+
+    # Every page is parsed as soon as it is handed on, only the pages
+    # in the reorder buffer are held in memory at once
+    for document in get_all_page_documents(documents, urls):
+        teams = TEAMS_TABLE.extract_rows(document)
+        row_counts.append(len(teams))
+        for team_info in teams:
+            team_infos.append(team_info)
+            teams_collected += 1
+            print(teams_collected)
+    if check_row_counts(row_counts):
+        break
+    print(f'Could not get the teams in pages of {per_page} teams')
+
+df = pd.DataFrame.from_records(team_infos, columns=TEAMS_TABLE.fields)
+df.index = range(1, len(df) + 1)
+df.index.name = 'record_id'
+df.to_csv('teams.csv', index=True)
+
 print(f'--- {time.time() - start_time} seconds ---')
\ No newline at end of file
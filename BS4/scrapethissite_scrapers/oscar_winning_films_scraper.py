@@ -1,41 +1,59 @@
-import json
-import requests
-import pandas as pd
-import concurrent.futures
-from concurrent.futures import ThreadPoolExecutor
-
-def get_page_json(url: str):
-    response = requests.get(url)
-    return response.content
-
-def get_all_pages_jsons(urls: list[str]) -> list[str]:
-    with ThreadPoolExecutor(max_workers=4) as executor:
-        future_results = {
-            executor.submit(get_page_json, url): url for url in urls
-        }
-        json_records = []
-        for future in concurrent.futures.as_completed(future_results):
-            json_records.append(future.result())
-    return json_records
-
-
-URLS = [
-    f'https://www.scrapethissite.com/pages/ajax-javascript/?ajax=true&year={year}'
-    for year in range(2010, 2015 + 1)
-]
-
-records = []
-json_files = get_all_pages_jsons(URLS)
-
-for json_file in json_files:
-    page_records = json.loads(json_file)
-    for record in page_records:
-        if record.get('best_picture', -1) == -1:
-            record['best_picture'] = False
-        records.append(record)
-    
-
-df = pd.DataFrame.from_dict(records)
-df.index = range(1, len(df) + 1)
-df.index.name = 'row_number'
-df.to_csv('films.csv', index=True)
\ No newline at end of file
+import os
+import json
+import asyncio
+import requests
+import pandas as pd
+from site_runner import SiteSpec
+from reorder_buffer import map_in_order
+
+URLS = [
+    f'https://www.scrapethissite.com/pages/ajax-javascript/?ajax=true&year={year}'
+    for year in range(2010, 2015 + 1)
+]
+# Where the site runner writes the films, next to this script
+FILMS_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'films.csv')
+
+def get_page_json(url: str):
+    response = requests.get(url)
+    return response.content
+
+def get_all_pages_jsons(urls: list[str]):
+    '''
+    Yields the responses of the given years in the order of the years
+    '''
+    yield from map_in_order(get_page_json, urls, max_workers=4)
+
+
+def get_page_records(page_records: list[dict], url: str=None) -> list[dict]:
+    '''
+    Returns the films of a year. Films that did not win best picture
+    do not have the key in the response.
+    '''
+    for record in page_records:
+        if record.get('best_picture', -1) == -1:
+            record['best_picture'] = False
+    return page_records
+
+def store_films(records: list[dict], filepath: str) -> None:
+    df = pd.DataFrame.from_dict(records)
+    df.index = range(1, len(df) + 1)
+    df.index.name = 'row_number'
+    df.to_csv(filepath, index=True)
+
+
+# Used by site_runner.py to scrape the films along with other sites
+SPEC = SiteSpec(
+    name='oscar_winning_films',
+    seed_urls=URLS,
+    load=json.loads,
+    extract_rows=get_page_records,
+    # Written in a thread so the other sites are not blocked meanwhile
+    sink=lambda records, runner: asyncio.to_thread(store_films, records, FILMS_CSV_PATH),
+)
+
+if __name__ == '__main__':
+    records = []
+    for json_file in get_all_pages_jsons(URLS):
+        records.extend(get_page_records(json.loads(json_file)))
+
+    store_films(records, 'films.csv')
\ No newline at end of file
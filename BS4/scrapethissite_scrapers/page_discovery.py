@@ -0,0 +1,172 @@
+'''
+Finds the last page of a paginated site. The pagination widget is
+read when the page has one. Otherwise pages are probed in rounds of
+requests sent at once: first at exponentially growing page numbers
+until one is past the end (galloping), then at evenly spaced page
+numbers between the last valid and the first invalid page. Every
+round shrinks the range by a factor of the number of probes per round,
+so the last page is found in O(log n) round trips. Probes never go past
+MAX_PAGE_NUMBER, and a server answering page numbers past the end with
+its last page is recognised by probes coming back with the same rows.
+
+The search itself is a generator yielding the page numbers of every
+round and receiving the rows of each of them. It is driven with
+blocking requests by find_last_page and with coroutines by
+find_last_page_async, so the same search is used by the threaded
+scripts and the site runner.
+'''
+
+# Number of pages probed at once in every round
+PROBES_PER_ROUND = 4
+# Page sizes asked for with the per_page parameter, largest first.
+# A server capping the page size answers with its largest size
+# instead, which is fine as long as it keeps to it on every page.
+# None leaves the parameter out to fall back to the default size.
+PAGE_SIZES = (1000, 100, None)
+# Highest page number probed, so that the search ends even on a server
+# whose pages never run out
+MAX_PAGE_NUMBER = 10_000
+
+def get_widget_page_count(link_texts: list[str]) -> int:
+    '''
+    Returns the highest page number among the texts of the links of
+    the pagination widget of the page, or None if it has no widget
+    '''
+    page_numbers = [int(text.strip()) for text in link_texts if text.strip().isdigit()]
+    return max(page_numbers, default=None)
+
+def check_row_counts(row_counts: list[int]) -> bool:
+    '''
+    Returns whether the numbers of rows of the pages, in page order,
+    fit a single page size: every page is as full as the first one
+    except for the last one, which is not empty. Pages that do not
+    fit mean the server did not keep to the page size asked for.
+    '''
+    if not row_counts:
+        return False
+    page_size = row_counts[0]
+    return (
+        all(row_count == page_size for row_count in row_counts[:-1])
+        and 0 < row_counts[-1] <= page_size
+    )
+
+def get_probes_per_round(widget_page_count: int) -> int:
+    '''
+    Returns how many pages to probe at once. A page count read from
+    the widget only needs the page after it to be checked, which is
+    done with a single probe. The search goes on from there if the
+    widget turns out not to list the last page.
+    '''
+    return PROBES_PER_ROUND if widget_page_count is None else 1
+
+def search_last_page(
+        known_page: int=1,
+        probes_per_round: int=PROBES_PER_ROUND,
+        max_page: int=MAX_PAGE_NUMBER
+):
+    '''
+    Generator searching for the last page after the given page, which
+    is known to have rows. Yields lists of page numbers to probe,
+    expects to be sent the rows of each of them and returns the last
+    page number. Pages are assumed to have rows up to the last page
+    and none after it, or the rows of the last page on servers that
+    answer page numbers past the end with the last page. No page after
+    max_page is probed.
+    '''
+    # Rows of the probed pages keyed by their page number
+    probed_rows = {}
+    step = 1
+    while True:
+        last_valid, first_invalid, is_clamped = narrow(probed_rows, known_page)
+        if first_invalid is None and last_valid >= max_page:
+            if max_page not in probed_rows or max_page - 1 in probed_rows:
+                return max_page
+            # The rows of max_page can be those of the page before it on
+            # a server whose last page is max_page - 1, as no page past
+            # max_page is probed to tell them apart
+            pages = [max_page - 1]
+        elif first_invalid is None:
+            # Galloping until a page past the end has been found, the
+            # step between probes doubles with every probe
+            pages = sorted({
+                min(last_valid + step * 2 ** exponent, max_page)
+                for exponent in range(probes_per_round)
+            })
+            step *= 2 ** probes_per_round
+        elif first_invalid - last_valid > 1:
+            # Searching the remaining range with evenly spaced probes
+            gap = first_invalid - last_valid
+            pages = sorted({
+                last_valid + max(1, gap * probe // (probes_per_round + 1))
+                for probe in range(1, probes_per_round + 1)
+            } - {first_invalid})
+        elif is_clamped and last_valid not in probed_rows:
+            # The first page with the rows of the last page is the last
+            # page unless the known page has these rows as well
+            pages = [last_valid]
+        elif is_clamped:
+            return first_invalid
+        else:
+            return last_valid
+        probed_rows.update(zip(pages, (yield pages)))
+
+def narrow(probed_rows: dict, known_page: int) -> tuple:
+    '''
+    Returns the last valid and first invalid page numbers known from
+    the rows of the probed pages, and whether the server answers page
+    numbers past the end with the last page. Pages without rows are
+    invalid. A server doing so is recognised by two probed pages with
+    the same rows, and every page with these rows counts as invalid.
+    '''
+    seen_rows = set()
+    clamped_rows = None
+    for rows in map(tuple, probed_rows.values()):
+        if rows and rows in seen_rows:
+            clamped_rows = rows
+        seen_rows.add(rows)
+    last_valid = known_page
+    first_invalid = None
+    for page, rows in probed_rows.items():
+        if rows and tuple(rows) != clamped_rows:
+            last_valid = max(last_valid, page)
+        elif first_invalid is None or page < first_invalid:
+            first_invalid = page
+    return last_valid, first_invalid, clamped_rows is not None
+
+def find_last_page(
+        probe_pages: callable,
+        known_page: int=1,
+        probes_per_round: int=PROBES_PER_ROUND,
+        max_page: int=MAX_PAGE_NUMBER
+) -> int:
+    '''
+    Returns the last page. probe_pages takes a list of page numbers
+    and returns the rows of each of them, e.g. by sending their
+    requests at once with a thread pool.
+    '''
+    search = search_last_page(known_page, probes_per_round, max_page)
+    rows = None
+    while True:
+        try:
+            pages = search.send(rows)
+        except StopIteration as stop:
+            return stop.value
+        rows = probe_pages(pages)
+
+async def find_last_page_async(
+        probe_pages: callable,
+        known_page: int=1,
+        probes_per_round: int=PROBES_PER_ROUND,
+        max_page: int=MAX_PAGE_NUMBER
+) -> int:
+    '''
+    Same as find_last_page with a coroutine function probing the pages
+    '''
+    search = search_last_page(known_page, probes_per_round, max_page)
+    rows = None
+    while True:
+        try:
+            pages = search.send(rows)
+        except StopIteration as stop:
+            return stop.value
+        rows = await probe_pages(pages)
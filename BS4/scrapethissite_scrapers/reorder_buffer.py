@@ -0,0 +1,41 @@
+from itertools import islice
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+'''
+Fetches pages with a pool of threads and hands them on in the order of
+their URLs instead of the order in which they finish, so the rows of
+the scrapers get the same record IDs on every run. A page that finishes
+early waits in the buffer until all pages before it have been handed
+on. The number of pages running or waiting in the buffer is bounded,
+so a slow page never makes all the other pages pile up in memory.
+'''
+
+# Number of pages that can be running or finished but not yet
+# handed on at once
+MAX_BUFFERED_PAGES = 8
+
+def map_in_order(
+        function: callable,
+        items,
+        max_workers: int=4,
+        max_buffered: int=MAX_BUFFERED_PAGES
+):
+    '''
+    Yields the results of calling the function on every item, in the
+    order of the items and as soon as the next one is finished. New
+    items are only started while fewer than max_buffered results are
+    running or waiting to be yielded.
+    '''
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Futures in the order of their items, the first one is the
+        # next result to yield
+        buffer = deque(
+            executor.submit(function, item) for item in islice(items, max_buffered)
+        )
+        while buffer:
+            result = buffer.popleft().result()
+            for item in islice(items, 1):
+                buffer.append(executor.submit(function, item))
+            yield result
@@ -0,0 +1,58 @@
+import time
+import asyncio
+import argparse
+import countries_scraper
+import hockey_teams_scraper
+import advanced_scraper_headers
+import oscar_winning_films_scraper
+from turtle_scraper import turtle_scraper
+from site_runner import SiteRunner, MAX_CONCURRENT_REQUESTS
+
+'''
+Runs any of the scrapers of this directory concurrently with the
+shared site runner, e.g. for a nightly run of every site:
+
+    python run_sites.py
+    python run_sites.py hockey_teams turtles
+'''
+
+SITES = {
+    spec.name: spec
+    for spec in (
+        countries_scraper.SPEC,
+        hockey_teams_scraper.SPEC,
+        advanced_scraper_headers.SPEC,
+        oscar_winning_films_scraper.SPEC,
+        turtle_scraper.SPEC,
+    )
+}
+
+async def main() -> None:
+    argument_parser = argparse.ArgumentParser(
+        description='Scrapes the given sites (default: all of them) at once'
+    )
+    argument_parser.add_argument(
+        'sites',
+        nargs='*',
+        help=f"sites to scrape, any of {', '.join(SITES)}"
+    )
+    argument_parser.add_argument(
+        '--max-concurrent-requests',
+        type=int,
+        default=MAX_CONCURRENT_REQUESTS,
+        help='requests in flight at once across all sites (default: %(default)s)'
+    )
+    arguments = argument_parser.parse_args()
+    unknown_sites = set(arguments.sites) - set(SITES)
+    if unknown_sites:
+        argument_parser.error(f"unknown sites: {', '.join(sorted(unknown_sites))}")
+    start_time = time.time()
+
+    runner = SiteRunner(arguments.max_concurrent_requests)
+    await runner.run([SITES[name] for name in arguments.sites or SITES])
+
+    print(f'--- {time.time() - start_time} seconds ---')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,164 @@
+import time
+import asyncio
+import inspect
+import httpx
+from dataclasses import dataclass, field
+from typing import Callable
+from bs4 import BeautifulSoup
+
+'''
+A shared engine for the scrapers of this directory. Every scraper is
+declared as a SiteSpec (seed URLs, pagination rule, row extractor and
+sink) and any number of them are run concurrently in one event loop.
+All sites share a single connection pool and a single limit on the
+number of requests in flight, so a run of every site takes roughly as
+long as the slowest one instead of the sum of all of them.
+'''
+
+# Number of requests that can be in flight at once across all sites
+MAX_CONCURRENT_REQUESTS = 8
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:129.0) Gecko/20100101 Firefox/129.0',
+}
+
+def load_soup(body: bytes) -> BeautifulSoup:
+    return BeautifulSoup(body, 'html.parser')
+
+def no_pagination(document, url: str, runner=None) -> list[str]:
+    return []
+
+def get_url_and_document(next_page) -> tuple:
+    '''
+    Returns the URL of a page returned by a pagination rule along with
+    its document, or None if it has not been fetched yet
+    '''
+    if isinstance(next_page, tuple):
+        return next_page
+    return next_page, None
+
+
+@dataclass
+class Fallback:
+    '''
+    Returned by a pagination rule when the rows of the page are not to
+    be kept, e.g. because the site did not keep to the page size asked
+    for. The given pages are scraped in place of the page.
+    '''
+    pages: list
+
+
+@dataclass
+class SiteSpec:
+    '''
+    Describes how one site is scraped. Every fetched page is loaded
+    into a document (a BeautifulSoup object by default) and handed to
+    the pagination rule, which returns the URLs of further pages to
+    fetch, and to the row extractor, which returns the page's rows.
+    The pagination rule can also return (URL, document) pairs for pages
+    it already fetched itself, a None document meaning the page still
+    has to be fetched, or a Fallback to scrape other pages instead of
+    the page.
+    Once all pages are done the sink is called with the rows in the
+    order of the pages they came from. The pagination rule and the
+    sink are also given the runner, so they can fetch pages or files
+    (e.g. images) under the same limits, and can be coroutine
+    functions.
+    '''
+    name: str
+    seed_urls: list[str]
+    extract_rows: Callable
+    sink: Callable
+    paginate: Callable = no_pagination
+    load: Callable = load_soup
+    headers: dict = field(default_factory=dict)
+
+
+class SiteRunner:
+    '''
+    Runs site specs with one shared client and one concurrency limit
+    '''
+    def __init__(
+            self,
+            max_concurrent_requests: int=MAX_CONCURRENT_REQUESTS,
+            transport: httpx.AsyncBaseTransport=None
+    ) -> None:
+        self.client = httpx.AsyncClient(
+            headers=HEADERS,
+            timeout=30,
+            follow_redirects=True,
+            transport=transport,
+            limits=httpx.Limits(max_connections=max_concurrent_requests),
+        )
+        self.semaphore = asyncio.Semaphore(max_concurrent_requests)
+
+    async def fetch(self, url: str, headers: dict=None) -> bytes:
+        '''
+        Returns the body of the response for the given URL, or None if
+        the request failed
+        '''
+        async with self.semaphore:
+            try:
+                response = await self.client.get(url, headers=headers)
+            except httpx.HTTPError as error:
+                print(f'Error while requesting {url}: {error}')
+                return None
+        if response.status_code != 200:
+            print(f'Error Code: {response.status_code} ({url})')
+            return None
+        return response.content
+
+    async def run_spec(self, spec: SiteSpec) -> int:
+        '''
+        Scrapes every page of the given site and hands its rows to the
+        site's sink. Returns the number of rows.
+        '''
+        # Rows keyed by the position of their page in the crawl, e.g.
+        # (1, 3) for the third page found on the second seed page
+        page_rows = {}
+
+        async def scrape_page(url: str, position: tuple, document=None) -> None:
+            if document is None:
+                body = await self.fetch(url, spec.headers)
+                if body is None:
+                    return
+                document = spec.load(body)
+            page_rows[position] = spec.extract_rows(document, url)
+            next_pages = spec.paginate(document, url, self)
+            if inspect.isawaitable(next_pages):
+                next_pages = await next_pages
+            if isinstance(next_pages, Fallback):
+                del page_rows[position]
+                next_pages = next_pages.pages
+            await asyncio.gather(*[
+                scrape_page(next_url, position + (index,), next_document)
+                for index, (next_url, next_document)
+                in enumerate(map(get_url_and_document, next_pages))
+            ])
+
+        await asyncio.gather(*[
+            scrape_page(url, (index,)) for index, url in enumerate(spec.seed_urls)
+        ])
+        rows = [row for position in sorted(page_rows) for row in page_rows[position]]
+        result = spec.sink(rows, self)
+        if inspect.isawaitable(result):
+            await result
+        return len(rows)
+
+    async def run(self, specs: list[SiteSpec]) -> None:
+        '''
+        Runs the given specs concurrently and prints how long each of
+        them took
+        '''
+        async def run_timed(spec: SiteSpec) -> None:
+            start_time = time.time()
+            try:
+                row_count = await self.run_spec(spec)
+            except Exception as error:
+                print(f'{spec.name} failed: {error!r}')
+                return
+            print(f'{spec.name}: {row_count} rows in {time.time() - start_time:.2f} seconds')
+
+        try:
+            await asyncio.gather(*[run_timed(spec) for spec in specs])
+        finally:
+            await self.client.aclose()
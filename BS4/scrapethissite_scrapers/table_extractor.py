@@ -0,0 +1,170 @@
+from collections import namedtuple
+from bs4 import BeautifulSoup
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:
+    lxml_html = None
+
+'''
+Extracts the rows of an HTML table as tuples. Every row is walked once:
+each of its cells is matched to a column by one of its class tokens
+(e.g. 'pct' for <td class="pct text-success">) or by its position in
+the row, instead of searching the row again for every column. Pages
+are parsed with lxml, or with BeautifulSoup when lxml is not installed.
+'''
+
+# name: name of the value in the row tuples
+# class_token: class token of the cells holding the value
+# position: index of the cells holding the value among the cells of
+#           their row, used when class_token is None
+# tag: element inside the cell to read, None means the cell itself
+# attribute: attribute to read from the element, None means its text
+Column = namedtuple(
+    'Column',
+    ['name', 'class_token', 'position', 'tag', 'attribute'],
+    defaults=[None, None, None, None]
+)
+
+def has_class_xpath(class_token: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_token} ')"
+
+def get_table_xpath(table_attributes: dict) -> str:
+    conditions = [
+        has_class_xpath(value) if name == 'class' else f"@{name}='{value}'"
+        for name, value in table_attributes.items()
+    ]
+    return f"(//table[{' and '.join(conditions)}])[1]"
+
+
+class BaseTableExtractor:
+    '''
+    Works out which column every cell of a row belongs to. Rows are
+    the rows of the first table with the given attributes that have
+    the given class token, or all rows with data cells if row_class is
+    None (which leaves out a header row of <th> cells).
+    '''
+    def __init__(self, columns: tuple, table_attributes: dict, row_class: str=None) -> None:
+        self.columns = columns
+        self.fields = tuple(column.name for column in columns)
+        self.table_attributes = table_attributes
+        self.row_class = row_class
+        # Column indexes keyed by the class tokens and positions of
+        # their cells
+        self.class_columns = {
+            column.class_token: index
+            for index, column in enumerate(columns)
+            if column.class_token is not None
+        }
+        self.position_columns = {
+            column.position: index
+            for index, column in enumerate(columns)
+            if column.class_token is None
+        }
+
+    def get_column_index(self, position: int, class_names: list[str]) -> int:
+        '''
+        Returns the index of the column of the cell at the given
+        position of its row, or None if it is not extracted
+        '''
+        for class_name in class_names:
+            if class_name in self.class_columns:
+                return self.class_columns[class_name]
+        return self.position_columns.get(position)
+
+    def extract(self, html: bytes) -> list[tuple]:
+        return self.extract_rows(self.load(html))
+
+    def extract_rows(self, document) -> list[tuple]:
+        return [self.extract_row(row) for row in self.find_rows(document)]
+
+    def extract_row(self, row) -> tuple:
+        '''
+        Returns the values of the row in the order of the columns.
+        Values of columns without a cell in the row are None.
+        '''
+        values = [None] * len(self.columns)
+        for position, cell in enumerate(self.get_cells(row)):
+            index = self.get_column_index(position, self.get_class_names(cell))
+            if index is not None:
+                values[index] = self.read_cell(cell, self.columns[index])
+        return tuple(values)
+
+
+class LxmlTableExtractor(BaseTableExtractor):
+    def __init__(self, columns: tuple, table_attributes: dict, row_class: str=None) -> None:
+        super().__init__(columns, table_attributes, row_class)
+        row_condition = 'td' if row_class is None else has_class_xpath(row_class)
+        self.find_rows = etree.XPath(f'{get_table_xpath(table_attributes)}//tr[{row_condition}]')
+        self.html_parser = lxml_html.HTMLParser(encoding='utf-8')
+
+    def load(self, html: bytes):
+        if isinstance(html, bytes):
+            return lxml_html.document_fromstring(html, parser=self.html_parser)
+        return lxml_html.document_fromstring(html)
+
+    def get_link_texts(self, document, list_class: str) -> list[str]:
+        '''
+        Returns the texts of the links in the first list with the given
+        class token, e.g. the page numbers of a pagination widget
+        '''
+        links = document.xpath(f'(//ul[{has_class_xpath(list_class)}])[1]//a')
+        return [link.text_content() for link in links]
+
+    def get_cells(self, row) -> list:
+        return row.iterchildren('td')
+
+    def get_class_names(self, cell) -> list[str]:
+        return cell.get('class', '').split()
+
+    def read_cell(self, cell, column: Column) -> str:
+        if column.tag is not None:
+            cell = cell.find(f'.//{column.tag}')
+            if cell is None:
+                return None
+        if column.attribute is not None:
+            return cell.get(column.attribute, '').strip()
+        return cell.text_content().strip()
+
+
+class SoupTableExtractor(BaseTableExtractor):
+    def load(self, html: bytes) -> BeautifulSoup:
+        return BeautifulSoup(html, 'html.parser')
+
+    def find_rows(self, soup: BeautifulSoup) -> list:
+        table = soup.find('table', self.table_attributes)
+        if table is None:
+            return []
+        if self.row_class is not None:
+            return table.find_all('tr', {'class': self.row_class})
+        return [row for row in table.find_all('tr') if row.find('td', recursive=False)]
+
+    def get_link_texts(self, soup: BeautifulSoup, list_class: str) -> list[str]:
+        link_list = soup.find('ul', {'class': list_class})
+        if link_list is None:
+            return []
+        return [link.get_text() for link in link_list.find_all('a')]
+
+    def get_cells(self, row) -> list:
+        return row.find_all('td', recursive=False)
+
+    def get_class_names(self, cell) -> list[str]:
+        return cell.get('class', [])
+
+    def read_cell(self, cell, column: Column) -> str:
+        if column.tag is not None:
+            cell = cell.find(column.tag)
+            if cell is None:
+                return None
+        if column.attribute is not None:
+            return cell.get(column.attribute, '').strip()
+        return cell.get_text().strip()
+
+
+def get_table_extractor(columns: tuple, table_attributes: dict, row_class: str=None):
+    '''
+    Returns an extractor for the given table using lxml, falling back
+    to BeautifulSoup when lxml is not available
+    '''
+    if lxml_html is not None:
+        return LxmlTableExtractor(columns, table_attributes, row_class)
+    return SoupTableExtractor(columns, table_attributes, row_class)
@@ -0,0 +1,50 @@
+import asyncio
+import pytest
+from page_discovery import MAX_PAGE_NUMBER, find_last_page, find_last_page_async
+
+'''
+Search for the last page against simulated servers, which either
+answer pages past the end without rows or with the rows of their last
+page (clamping)
+'''
+
+def get_page_prober(last_page: int, clamps: bool, probed: list) -> callable:
+    def probe_pages(pages: list[int]) -> list[list]:
+        probed.extend(pages)
+        return [
+            [('row', min(page, last_page))] if page <= last_page or clamps else []
+            for page in pages
+        ]
+    return probe_pages
+
+LAST_PAGES = [1, 2, 6, 17, 1000, 4097, MAX_PAGE_NUMBER - 2, MAX_PAGE_NUMBER - 1, MAX_PAGE_NUMBER]
+
+@pytest.mark.parametrize('clamps', [False, True])
+@pytest.mark.parametrize('probes_per_round', [1, 4])
+@pytest.mark.parametrize('last_page', LAST_PAGES)
+def test_finds_last_page(last_page, probes_per_round, clamps):
+    probed = []
+    probe_pages = get_page_prober(last_page, clamps, probed)
+
+    assert find_last_page(probe_pages, 1, probes_per_round) == last_page
+    assert max(probed, default=1) <= MAX_PAGE_NUMBER
+
+@pytest.mark.parametrize('clamps', [False, True])
+def test_stops_at_max_page(clamps):
+    probe_pages = get_page_prober(MAX_PAGE_NUMBER * 3, clamps, [])
+
+    assert find_last_page(probe_pages) == MAX_PAGE_NUMBER
+
+@pytest.mark.parametrize('known_page', [1, 5, MAX_PAGE_NUMBER - 1])
+def test_clamped_last_page_before_max_page(known_page):
+    # Only max_page is past the end, so its rows are those of the last
+    # page and the search has to look at the page before it
+    probe_pages = get_page_prober(MAX_PAGE_NUMBER - 1, True, [])
+
+    assert find_last_page(probe_pages, known_page) == MAX_PAGE_NUMBER - 1
+
+def test_async_search_matches_blocking_search():
+    async def probe_pages(pages: list[int]) -> list[list]:
+        return get_page_prober(MAX_PAGE_NUMBER - 1, True, [])(pages)
+
+    assert asyncio.run(find_last_page_async(probe_pages)) == MAX_PAGE_NUMBER - 1
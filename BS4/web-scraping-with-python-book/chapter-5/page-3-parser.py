@@ -1,43 +1,56 @@
-from urllib.request import urlopen
-from bs4 import BeautifulSoup, Tag
-import csv
-
-'''
-This is a simple program meant to practice scraping
-tables in a web page through the use of sibling and
-children tags
-'''
-
-# Open URL and create a BeautifulSoup object
-html = urlopen('https://www.pythonscraping.com/pages/page3.html')
-bs = BeautifulSoup(html, 'html.parser')
-
-# Get the header row of the table so you can get its children
-table_title_row = bs.find('table', {'id':'giftList'}).tr
-
-# Create list to store all individual rows
-table_rows = []
-
-# Iterate over each row and save in the list in form of dictionaries
-for sibling in table_title_row.next_siblings:
-    if isinstance(sibling, Tag):
-        values = sibling.find_all('td')
-        table_row = {
-            'Item_Title' : values[0].get_text().strip(),
-            'Description' : values[1].get_text().strip(),
-            'Cost' : values[2].get_text().strip().replace('$', '').replace(',', ''),
-            'Image_URL' : values[3].img['src'].strip().replace('..', 'https://www.pythonscraping.com')
-        }
-        table_rows.append(table_row)
-
-# Save all data to a CSV file
-with open('page-3.csv', 'w') as csvFile:
-
-    fields = ['Item_Title', 'Description', 'Cost', 'Image_URL']
-
-    writer = csv.DictWriter(csvFile, fieldnames=fields)
-
-    writer.writeheader()
-
-    for row in table_rows:
+import os
+import sys
+from urllib.request import urlopen
+import csv
+# table_extractor.py is in the scrapethissite_scrapers directory
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'scrapethissite_scrapers'
+))
+from table_extractor import Column, get_table_extractor
+
+'''
+This is a simple program meant to practice scraping
+tables in a web page. The cells of every row are read
+in a single pass and matched to the columns by their
+position in the row.
+'''
+
+# Columns of the gift table, the image URL is read from
+# the image in the fourth cell
+GIFT_COLUMNS = (
+    Column('Item_Title', position=0),
+    Column('Description', position=1),
+    Column('Cost', position=2),
+    Column('Image_URL', position=3, tag='img', attribute='src'),
+)
+
+# Open URL and read the table's rows as tuples, the header
+# row has no data cells and is left out
+html = urlopen('https://www.pythonscraping.com/pages/page3.html').read()
+gift_table = get_table_extractor(GIFT_COLUMNS, {'id': 'giftList'})
+
+# Create list to store all individual rows
+table_rows = []
+
+# Iterate over each row and save in the list in form of dictionaries
+for item_title, description, cost, image_url in gift_table.extract(html):
+    table_row = {
+        'Item_Title' : item_title,
+        'Description' : description,
+        'Cost' : cost.replace('$', '').replace(',', ''),
+        'Image_URL' : image_url.replace('..', 'https://www.pythonscraping.com')
+    }
+    table_rows.append(table_row)
+
+# Save all data to a CSV file
+with open('page-3.csv', 'w') as csvFile:
+
+    fields = ['Item_Title', 'Description', 'Cost', 'Image_URL']
+
+    writer = csv.DictWriter(csvFile, fieldnames=fields)
+
+    writer.writeheader()
+
+    for row in table_rows:
         writer.writerow(row)
\ No newline at end of file